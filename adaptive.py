@@ -0,0 +1,61 @@
+import numpy as np
+
+
+class OnlineLDA:
+    """Two-class LDA whose class means and pooled covariance track the signal.
+
+    Starts from a fitted sklearn LinearDiscriminantAnalysis (trained with
+    store_covariance=True), or its CompiledModel export, and then updates
+    with exponential forgetting: each labelled feature vector nudges its
+    class mean and the shared covariance.
+    The inverse covariance is maintained directly with a Sherman-Morrison
+    rank-one update, so an update is O(features²) and nothing is ever refit.
+    """
+
+    def __init__(self, means, covariance, priors, classes, forgetting=0.995, ridge=1e-6):
+        self.means = np.array(means, dtype=np.float64)
+        d = self.means.shape[1]
+        cov = np.array(covariance, dtype=np.float64) + ridge * np.trace(covariance) / d * np.eye(d)
+        self.precision = np.linalg.inv(cov)
+        self.log_prior_ratio = float(np.log(priors[1] / priors[0]))
+        self.classes_ = np.asarray(classes)
+        self.forgetting = forgetting
+        self.updates = 0
+        self._recompute()
+
+    @classmethod
+    def from_lda(cls, clf, **kwargs):
+        if len(clf.classes_) != 2 or getattr(clf, "covariance_", None) is None:
+            raise ValueError("Online adaptation needs a two-class LDA trained with store_covariance=True")
+        return cls(clf.means_, clf.covariance_, clf.priors_, clf.classes_, **kwargs)
+
+    def _recompute(self):
+        mu0, mu1 = self.means
+        self.coef = self.precision @ (mu1 - mu0)
+        self.intercept = -0.5 * self.coef @ (mu0 + mu1) + self.log_prior_ratio
+
+    def predict_proba(self, x):
+        """Probability of each class for one feature vector."""
+        p1 = 1.0 / (1.0 + np.exp(-(self.coef @ x + self.intercept)))
+        return np.array([1.0 - p1, p1])
+
+    def predict(self, x):
+        return self.classes_[int(self.coef @ x + self.intercept > 0)]
+
+    def update(self, x, label, rate=1.0):
+        """Fold one labelled feature vector in; `rate` < 1 for less trusted (self-)labels."""
+        k = int(np.flatnonzero(self.classes_ == label)[0])
+        eta = (1.0 - self.forgetting) * rate
+        lam = 1.0 - eta
+
+        diff = x - self.means[k]
+        self.means[k] += eta * diff
+
+        # cov' = lam * cov + eta * diff diffᵀ, inverse via Sherman-Morrison
+        p_diff = self.precision @ diff
+        c = eta / lam
+        self.precision -= np.outer(p_diff, p_diff) * (c / (1.0 + c * diff @ p_diff))
+        self.precision /= lam
+
+        self._recompute()
+        self.updates += 1
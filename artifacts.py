@@ -0,0 +1,134 @@
+import warnings
+import numpy as np
+from brainflow.board_shim import BoardIds
+
+REASONS = ("amplitude", "variance", "channel_outlier", "motion")
+AMPLITUDE, VARIANCE, CHANNEL_OUTLIER, MOTION = range(len(REASONS))
+
+MAX_PTP_UV = 300.0    # detrended peak-to-peak of one channel; blinks and cable pops exceed it
+MAX_MOTION_G2 = 0.05  # summed accelerometer variance over the three axes
+MAX_Z = 6.0           # robust z-score limit for variance, channel and motion outliers
+MIN_MAD = 0.25        # floor on the spread of log-variance, so very steady signals don't flag noise
+
+
+def _robust_z(x, center, mad):
+    return (x - center) / (1.4826 * np.maximum(mad, MIN_MAD))
+
+
+class ArtifactDetector:
+    """Flags epochs contaminated by blinks, muscle, cable or head motion.
+
+    Works on whole batches of (..., channels, samples) epochs at once. Every
+    epoch is reduced to one measure row: detrended peak-to-peak and log
+    variance per channel plus log accelerometer motion energy. These rows
+    are flagged against absolute limits and, once fit() has seen clean-ish
+    training data, against robust z-scores: per channel against its own
+    history, across channels against the others, and for motion.
+    """
+
+    def __init__(self, max_ptp=MAX_PTP_UV, max_motion=MAX_MOTION_G2, max_z=MAX_Z):
+        self.max_ptp = max_ptp
+        self.max_motion = max_motion
+        self.max_z = max_z
+        self.center = None  # per channel median log variance, then median log motion
+        self.mad = None
+
+    @classmethod
+    def for_board(cls, board_id, **kwargs):
+        # the synthetic board's sine waves reach ~1000 µV, absolute limits would reject everything
+        if board_id == BoardIds.SYNTHETIC_BOARD.value:
+            kwargs = dict(dict(max_ptp=None, max_motion=None), **kwargs)
+        return cls(**kwargs)
+
+    @property
+    def fitted(self):
+        return self.center is not None
+
+    def state(self):
+        """JSON-serialisable settings and fitted baselines, stored with a model."""
+        return {"max_ptp": self.max_ptp, "max_motion": self.max_motion, "max_z": self.max_z,
+                "center": None if self.center is None else self.center.tolist(),
+                "mad": None if self.mad is None else self.mad.tolist()}
+
+    @classmethod
+    def from_state(cls, state):
+        detector = cls(state["max_ptp"], state["max_motion"], state["max_z"])
+        if state.get("center") is not None:
+            detector.center = np.array(state["center"])
+            detector.mad = np.array(state["mad"])
+        return detector
+
+    def measure(self, epochs, accel=None):
+        """(..., 2 * channels + 1) measure rows: peak-to-peak, log variance, log motion energy."""
+        n_channels, n = epochs.shape[-2:]
+        out = np.empty(epochs.shape[:-2] + (2 * n_channels + 1,))
+
+        # remove offset and linear drift, the raw Cyton signal wanders by hundreds of µV
+        t = np.arange(n) - (n - 1) / 2
+        mean = epochs.mean(axis=-1, keepdims=True)
+        slope = (epochs @ t)[..., None] / (t @ t)
+        residual = epochs - mean - slope * t
+        out[..., :n_channels] = np.ptp(residual, axis=-1)
+        out[..., n_channels:2 * n_channels] = np.log(np.einsum("...s,...s->...", residual, residual) / n + 1e-12)
+
+        if accel is None:
+            out[..., -1] = np.nan
+        else:
+            # Cyton only sends accelerometer values on some packets, the rest read as zeros
+            valid = np.any(accel != 0, axis=-2, keepdims=True)
+            count = np.maximum(valid.sum(axis=-1), 1)
+            accel_mean = (accel * valid).sum(axis=-1) / count
+            accel_var = (((accel - accel_mean[..., None]) ** 2) * valid).sum(axis=-1) / count
+            out[..., -1] = np.log(accel_var.sum(axis=-1) + 1e-12)
+        return out
+
+    def fit_measures(self, measures):
+        """Learn robust baselines from measure rows of (mostly clean) training epochs."""
+        n_channels = (measures.shape[-1] - 1) // 2
+        rows = measures.reshape(-1, measures.shape[-1])[:, n_channels:]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # no accelerometer: the motion column is all NaN
+            self.center = np.nanmedian(rows, axis=0)
+            self.mad = np.nanmedian(np.abs(rows - self.center), axis=0)
+        return self
+
+    def fit(self, epochs, accel=None):
+        return self.fit_measures(self.measure(epochs, accel))
+
+    def flags_from(self, measures):
+        """Boolean (..., len(REASONS)) flags for measure rows."""
+        n_channels = (measures.shape[-1] - 1) // 2
+        ptp = measures[..., :n_channels]
+        log_var = measures[..., n_channels:2 * n_channels]
+        log_motion = measures[..., -1]
+        flags = np.zeros(measures.shape[:-1] + (len(REASONS),), dtype=bool)
+        with np.errstate(invalid="ignore"):
+            if self.max_ptp is not None:
+                flags[..., AMPLITUDE] = (ptp > self.max_ptp).any(axis=-1)
+            if self.max_motion is not None:
+                flags[..., MOTION] = log_motion > np.log(self.max_motion)
+            if self.fitted:
+                z = _robust_z(log_var, self.center[:n_channels], self.mad[:n_channels])
+                # one-sided: artifacts add power, a quiet channel is the signal quality monitor's business
+                flags[..., VARIANCE] = (z > self.max_z).any(axis=-1)
+                # one channel far from the others: electrode pop or local muscle
+                # (z is already in robust SD units, so its spread across channels is floored at 1)
+                median = np.median(z, axis=-1, keepdims=True)
+                spread = np.maximum(np.median(np.abs(z - median), axis=-1, keepdims=True), 1.0)
+                flags[..., CHANNEL_OUTLIER] = (np.abs(z - median) / (1.4826 * spread) > self.max_z).any(axis=-1)
+                flags[..., MOTION] |= _robust_z(log_motion, self.center[-1], self.mad[-1]) > self.max_z
+        return flags
+
+    def clean_from(self, measures):
+        """Boolean mask of unflagged measure rows; raises if nothing is left to train on."""
+        clean = ~self.flags_from(measures).any(axis=-1)
+        if not clean.any():
+            raise ValueError("Every epoch was flagged as an artifact, check the electrodes or the detector limits")
+        return clean
+
+    def flags(self, epochs, accel=None):
+        return self.flags_from(self.measure(epochs, accel))
+
+    def bad(self, epochs, accel=None):
+        """True for every epoch with at least one artifact flag."""
+        return self.flags(epochs, accel).any(axis=-1)
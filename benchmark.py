@@ -0,0 +1,256 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import contextlib
+import itertools
+import subprocess
+import tempfile
+import tracemalloc
+import numpy as np
+from brainflow.board_shim import BoardShim, BoardIds
+from artifacts import ArtifactDetector
+from board_source import load_recording
+from compiled_model import CompiledModel, export_model
+from features import band_sos, block_features, epoch_features, epoch_samples
+from recorder import SessionRecorder, iter_segments
+from runtime import RingBuffer
+from streaming_filter import StreamingBandpass
+from train_model import recording_features, fit_lda
+from utils import save_csv_with_header
+
+BASELINE_FILE = "benchmark_baseline.json"
+MIN_DELTA_MS = 0.05  # slowdowns below 50 µs are timer noise, not regressions
+SFREQ = 250
+STARTUP_BUDGET_MS = 1000  # cold start of main.py up to the model prompt
+HEAVY_MODULES = ("matplotlib", "sklearn", "pandas", "scipy", "pyttsx3")
+
+
+def synthetic_recordings(n_recordings, n_channels, seconds=3, sfreq=SFREQ, seed=0):
+    """Alternating eyes-open / eyes-closed recordings: noise, plus 10 Hz alpha when closed."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sfreq)) / sfreq
+    labels = np.arange(n_recordings) % 2
+    recordings = rng.normal(0, 10, (n_recordings, n_channels, t.size))
+    recordings += labels[:, None, None] * 20 * np.sin(2 * np.pi * 10 * t)
+    return list(recordings), labels
+
+
+def replayed_recordings(path, n_recordings, n_channels, seconds=3, sfreq=SFREQ):
+    """Chunks of a real recording, EEG rows tiled up to n_channels; labels alternate."""
+    eeg = load_recording(path)[BoardShim.get_eeg_channels(BoardIds.CYTON_BOARD.value)]
+    eeg = np.tile(eeg, (-(-n_channels // eeg.shape[0]), 1))[:n_channels]
+    size = int(seconds * sfreq)
+    starts = np.arange(n_recordings) * size % max(1, eeg.shape[1] - size)
+    return [eeg[:, s:s + size] for s in starts], np.arange(n_recordings) % 2
+
+
+def measure(fn, repeat, items=1, warmup=2):
+    """Latency percentiles, throughput (items/s) and peak traced memory of fn()."""
+    for _ in range(warmup):
+        fn()
+    timings = np.empty(repeat)
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - t0
+
+    # separate run so tracing doesn't skew the timings
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {"p50_ms": p50 * 1e3, "p95_ms": p95 * 1e3, "p99_ms": p99 * 1e3,
+            "throughput": items / timings.mean(), "peak_mb": peak / 1024 ** 2}
+
+
+def cases(make_recordings, quick):
+    """Yield (name, fn, repeat, items) for every benchmark."""
+    repeat = 20 if quick else 100
+
+    # Per-window feature extraction and streaming filter ticks
+    for n_channels in (8, 16, 32):
+        for window_sec in (0.5, 1.0, 2.0):
+            window = make_recordings(1, n_channels, window_sec)[0][0]
+            yield (f"features/{n_channels}ch/{window_sec}s",
+                   lambda w=window: epoch_features(w, SFREQ), repeat, 1)
+        window = make_recordings(1, n_channels, 1.0)[0][0]
+        yield (f"block_features/{n_channels}ch/1.0s",
+               lambda w=window, sos=band_sos(SFREQ): block_features(w, sos), repeat, 1)
+        detector = ArtifactDetector().fit(np.stack(make_recordings(20, n_channels, 1.0)[0]))
+        yield f"artifacts/{n_channels}ch/1.0s", lambda w=window, d=detector: d.bad(w), repeat, 1
+        block = make_recordings(1, n_channels, 0.1)[0][0]
+        bp = StreamingBandpass(n_channels, SFREQ)
+        yield f"stream_filter/{n_channels}ch/100ms", lambda b=block, f=bp: f.process(b), repeat, block.shape[1]
+
+    # One live dashboard frame at 30 fps: 16 scrolling channels and a new decision, rendered off-screen
+    import matplotlib
+    matplotlib.use("Agg")
+    from dashboard import Dashboard
+    signal = make_recordings(1, 16, 10)[0][0]
+    ring = RingBuffer(signal.shape[0] + 1, signal.shape[1])
+    ring.write(np.vstack([signal, np.zeros(signal.shape[1])]))
+    view = Dashboard(range(1, 17), SFREQ)
+    block = np.vstack([signal[:, :SFREQ // 30], np.zeros(SFREQ // 30)])
+
+    def frame():
+        ring.write(block)
+        view.set_decision(1, 0.9, signal[:, 0] ** 2, time.time())
+        view.render(ring)
+
+    yield "dashboard/16ch/frame", frame, repeat, 1
+
+    # train_new_model's path after recording, on growing datasets: artifact rejection with a freshly
+    # fitted detector, grouped CV over rounds (an open and a closed recording each), fit and .npz export
+    def train(recordings, labels):
+        rounds = np.arange(len(recordings)) // 2
+        with contextlib.redirect_stdout(io.StringIO()):  # its "Dropped n epochs" line, once per repeat
+            features, y, groups = recording_features(recordings, labels, SFREQ, rounds, detector=ArtifactDetector())
+        export_model(fit_lda(features, y, groups)[0], io.BytesIO())
+
+    for n_recordings in ((20, 80) if quick else (20, 80, 320)):
+        recordings, labels = make_recordings(n_recordings, 8, 3)
+        yield (f"train/{n_recordings}rec", lambda r=recordings, l=labels: train(r, l),
+               max(3, repeat // 10), n_recordings)
+
+    # Classifier throughput, single window and batched
+    recordings, labels = make_recordings(20, 8, 3)
+    clf = fit_lda(*recording_features(recordings, labels, SFREQ))[0]
+    features = epoch_features(np.stack(recordings)[:, :, :epoch_samples(SFREQ)[0]], SFREQ)
+    for batch in (1, 20):
+        x = features[:batch]
+        yield f"predict/batch{batch}", lambda x=x: clf.predict(x), repeat * 5, batch
+    # the .npz export live prediction loads, one window into preallocated buffers
+    compiled = CompiledModel.from_estimator(clf)
+    yield "predict/compiled", lambda: compiled.proba(features[0]), repeat * 5, 1
+
+    # Recording I/O: one 3 s Cyton frame as CSV vs binary segments
+    frame = np.random.default_rng(0).normal(size=(BoardShim.get_num_rows(BoardIds.CYTON_BOARD.value), 3 * SFREQ))
+    tmp = tempfile.mkdtemp(prefix="eegbrain_bench_")
+    csv_path = os.path.join(tmp, "open_bench.csv")
+
+    def write_binary():
+        recorder = SessionRecorder(os.path.join(tmp, "write"), BoardIds.CYTON_BOARD.value)
+        recorder.append(frame, label="open")
+        shutil.rmtree(recorder.close())
+
+    save_csv_with_header(frame, csv_path)
+    recorder = SessionRecorder(tmp, BoardIds.CYTON_BOARD.value)
+    recorder.append(frame, label="open")
+    session = recorder.close()
+    io_repeat = max(5, repeat // 4)
+    try:
+        yield "io/write_csv", lambda: save_csv_with_header(frame, csv_path), io_repeat, 1
+        yield "io/write_npy", write_binary, io_repeat, 1
+        yield "io/read_csv", lambda: load_recording(csv_path), io_repeat, 1
+        yield "io/read_npy", lambda: [np.asarray(d).sum() for _, d in iter_segments(session)], io_repeat, 1
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _startup(code):
+    """Run `code` in a fresh interpreter from the repo directory, as main.py would start."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    return subprocess.run([sys.executable, "-c", code], cwd=here, check=True, capture_output=True, text=True).stdout
+
+
+def startup_cases(quick):
+    """Cold start to the model prompt: importing main and reading the model registry."""
+    code = "import main, registry; registry.default_registry().sync()"
+    yield "startup/to_prompt", lambda: _startup(code), 3 if quick else 10, 1
+
+
+def heavy_startup_imports():
+    """Heavy modules that importing main pulls in, which should be none."""
+    out = _startup(f"import sys, main; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    return out.split()
+
+
+def compare(results, baseline, tolerance, min_delta_ms=MIN_DELTA_MS):
+    """Names of benchmarks whose p50 got slower than baseline * tolerance and by at least `min_delta_ms`.
+
+    The floor keeps microsecond benchmarks from failing on timer noise.
+    """
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base and r["p50_ms"] > base["p50_ms"] * tolerance and r["p50_ms"] - base["p50_ms"] >= min_delta_ms:
+            regressions.append(f"{name}: p50 {r['p50_ms']:.3f} ms vs baseline {base['p50_ms']:.3f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark startup, filtering, features, drawing, training, inference and recording I/O.")
+    parser.add_argument('--data', type=str, default=None,
+                        help='recording or folder to replay instead of synthetic signals')
+    parser.add_argument('--quick', action='store_true', help='fewer repeats and smaller datasets')
+    parser.add_argument('--filter', type=str, default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--baseline', type=str, default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--check', action='store_true',
+                        help='fail when there is no baseline to compare against, for CI gates')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed p50 slowdown factor vs baseline')
+    parser.add_argument('--min-delta-ms', type=float, default=MIN_DELTA_MS,
+                        help='slowdowns smaller than this never count as regressions')
+    args = parser.parse_args()
+
+    if args.data:
+        make_recordings = lambda n, ch, sec: replayed_recordings(args.data, n, ch, sec)
+    else:
+        make_recordings = lambda n, ch, sec: synthetic_recordings(n, ch, sec)
+
+    print(f"{'benchmark':<28}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'items/s':>12}{'peak MB':>10}")
+    results = {}
+    for name, fn, repeat, items in itertools.chain(startup_cases(args.quick), cases(make_recordings, args.quick)):
+        if args.filter not in name:
+            continue
+        r = measure(fn, repeat, items)
+        results[name] = r
+        print(f"{name:<28}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+              f"{r['throughput']:>12.1f}{r['peak_mb']:>10.2f}")
+
+    failed = False
+    if "startup/to_prompt" in results:
+        heavy = heavy_startup_imports()
+        if heavy:
+            print(f"\n✖ main.py imports {', '.join(heavy)} before the model prompt")
+            failed = True
+        if results["startup/to_prompt"]["p50_ms"] > STARTUP_BUDGET_MS:
+            print(f"\n✖ Startup takes {results['startup/to_prompt']['p50_ms']:.0f} ms, budget {STARTUP_BUDGET_MS} ms")
+            failed = True
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=1)
+        print(f"\nBaseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("\n✖ Performance regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.baseline}")
+    elif args.check:
+        print(f"\n✖ No baseline at {args.baseline} to check against. Create one with --save-baseline")
+        sys.exit(1)
+    else:
+        # timings are machine specific, each machine keeps its own baseline
+        print(f"\n⚠️ No baseline at {args.baseline}, nothing compared. Create one with --save-baseline")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import os
+import glob
+import time
+import hashlib
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds, BrainFlowError
+from brainflow.data_filter import DataFilter
+from recorder import is_session, iter_segments, read_meta
+
+SERIAL_PORT = "/dev/cu.usbserial-DP04VYIJ"
+TRAINING_DATA_DIR = "models/training_data"
+
+# cyton: real headset, synthetic: BrainFlow generated signal,
+# playback: BrainFlow PLAYBACK_FILE_BOARD (real time), replay: our own replayer (any speed)
+SOURCES = ("cyton", "synthetic", "playback", "replay")
+CYTON_BOARDS = (BoardIds.CYTON_BOARD.value, BoardIds.CYTON_DAISY_BOARD.value)
+
+
+def recording_board(path):
+    """Board id a recording was made with: from meta.json for sessions, Cyton for our CSVs."""
+    if is_session(path):
+        return read_meta(path)["board_id"]
+    if os.path.isdir(path):
+        boards = {recording_board(d) for d in glob.glob(os.path.join(path, "session_*")) if is_session(d)}
+        if glob.glob(os.path.join(path, "*.csv")):
+            boards.add(BoardIds.CYTON_BOARD.value)
+        if len(boards) > 1:
+            raise ValueError(f"{path} mixes recordings of boards {sorted(boards)}, replay one board's at a time")
+        return boards.pop() if boards else BoardIds.CYTON_BOARD.value
+    return BoardIds.CYTON_BOARD.value
+
+
+def load_recording(path):
+    """Load a session folder, a save_csv_with_header CSV, or every recording in a folder, as rows x samples."""
+    if is_session(path):
+        return np.concatenate([data for _, data in iter_segments(path)], axis=1)
+    if os.path.isdir(path):
+        # open_/closed_/session_ prefixes would group by label, order by the timestamp part instead
+        sessions = [d for d in glob.glob(os.path.join(path, "session_*")) if is_session(d)]
+        # a CSV imported into a session would otherwise play twice
+        imported = {read_meta(d).get("source") for d in sessions}
+        files = [f for f in glob.glob(os.path.join(path, "*.csv")) if os.path.basename(f) not in imported] + sessions
+        files.sort(key=lambda f: os.path.basename(f).split("_", 1)[-1])
+        if not files:
+            raise FileNotFoundError(f"No recordings found in {path}")
+        return np.concatenate([load_recording(f) for f in files], axis=1)
+    return np.ascontiguousarray(np.atleast_2d(np.loadtxt(path, delimiter=",", skiprows=1)).T)
+
+
+class ReplayBoard:
+    """Stand-in for BoardShim that replays a recording at `speed` x wall clock.
+
+    Only the parts of the BoardShim API the pipeline uses are implemented.
+    Timestamps are rewritten to the moment each sample becomes available, so
+    latency measured downstream stays meaningful at any speed.
+    """
+
+    board_id = BoardIds.PLAYBACK_FILE_BOARD.value
+
+    def __init__(self, data, master_board_id=BoardIds.CYTON_BOARD.value, speed=1.0, loop=True):
+        self.data = np.ascontiguousarray(data, dtype=np.float64)
+        if self.data.shape[0] != BoardShim.get_num_rows(master_board_id):
+            raise ValueError(f"Recording has {self.data.shape[0]} rows, board {master_board_id} streams "
+                             f"{BoardShim.get_num_rows(master_board_id)}")
+        self.master_board_id = master_board_id
+        self.speed = speed
+        self.loop = loop
+        self.rate = BoardShim.get_sampling_rate(master_board_id) * speed
+        self.timestamp_channel = BoardShim.get_timestamp_channel(master_board_id)
+        self.buffer_size = 450000
+        self._prepared = False
+        self._start = None   # perf_counter() when streaming (re)started
+        self._t0 = 0.0       # wall clock time of sample 0
+        self._offset = 0     # samples emitted before the last start_stream
+        self._read = 0       # samples already handed out by get_board_data
+
+    def prepare_session(self):
+        self._prepared = True
+
+    def is_prepared(self):
+        return self._prepared
+
+    def get_board_id(self):
+        return self.master_board_id
+
+    def start_stream(self, buffer_size=450000, streamer_params=None):
+        self.buffer_size = buffer_size
+        self._start = time.perf_counter()
+        self._t0 = time.time() - self._offset / self.rate
+        self._read = self._offset
+
+    def stop_stream(self):
+        self._offset = self._emitted()
+        self._start = None
+
+    def release_session(self):
+        if self._start is not None:
+            self.stop_stream()
+        self._prepared = False
+
+    def _emitted(self):
+        if self._start is None:
+            return self._offset
+        n = self._offset + int((time.perf_counter() - self._start) * self.rate)
+        return n if self.loop else min(n, self.data.shape[1])
+
+    def _take(self, start, stop):
+        idx = np.arange(start, stop)
+        out = self.data.take(idx % self.data.shape[1], axis=1)
+        out[self.timestamp_channel] = self._t0 + idx / self.rate
+        return out
+
+    def get_board_data(self, num_samples=None):
+        emitted = self._emitted()
+        start = max(self._read, emitted - self.buffer_size)
+        stop = emitted if num_samples is None else min(emitted, start + num_samples)
+        self._read = stop
+        return self._take(start, stop)
+
+
+def _playback_file(path):
+    """PLAYBACK_FILE_BOARD reads BrainFlow's own format, convert our CSVs once."""
+    if path.endswith(".csv") or os.path.isdir(path):
+        key = hashlib.md5(os.path.abspath(path).encode()).hexdigest()[:12]
+        out = os.path.join(tempfile.gettempdir(), f"eegbrain_playback_{key}.tsv")
+        DataFilter.write_file(load_recording(path), out, "w")
+        return out
+    return path
+
+
+def accel_rows(board_id):
+    """Accelerometer rows of a board, empty for boards without one (BrainFlow raises for those)."""
+    try:
+        return BoardShim.get_accel_channels(board_id)
+    except BrainFlowError:
+        return []
+
+
+def source_board_id(source="cyton", file=None):
+    """Board id whose channel layout `source` streams, known before anything is opened."""
+    if source == "cyton":
+        return BoardIds.CYTON_BOARD.value
+    if source == "synthetic":
+        return BoardIds.SYNTHETIC_BOARD.value
+    return recording_board(file or TRAINING_DATA_DIR)
+
+
+def open_board(source="cyton", serial_port=SERIAL_PORT, file=None, speed=1.0, instance=0):
+    """Return an unprepared board for the given source.
+
+    Everything downstream only talks to the BoardShim API and reads channel
+    layout and sampling rate from board.get_board_id(). BrainFlow refuses two
+    boards with identical parameters, so several synthetic or playback boards
+    in one process need distinct `instance` numbers.
+    """
+    if source not in SOURCES:
+        raise ValueError(f"Unknown board source '{source}', expected one of {SOURCES}")
+
+    params = BrainFlowInputParams()
+    if instance:
+        params.other_info = f"instance{instance}"
+    if source == "cyton":
+        params.serial_port = serial_port
+        return BoardShim(BoardIds.CYTON_BOARD.value, params)
+    if source == "synthetic":
+        return BoardShim(BoardIds.SYNTHETIC_BOARD.value, params)
+
+    file = file or TRAINING_DATA_DIR
+    master = recording_board(file)  # channel layout of the recorded board
+    if source == "replay" or speed != 1.0:
+        return ReplayBoard(load_recording(file), master_board_id=master, speed=speed)
+    params.file = _playback_file(file)
+    params.master_board = master
+    return BoardShim(BoardIds.PLAYBACK_FILE_BOARD.value, params)
+
+
+def board_sleep(board, seconds):
+    """Sleep for `seconds` of board time, shorter when a recording is replayed faster."""
+    time.sleep(seconds / getattr(board, "speed", 1.0))
+
+
+class BoardConnection:
+    """One prepared, streaming board that training and live prediction borrow in turn.
+
+    The serial handshake and stream start happen once per run instead of
+    once per stage. get_board_data() reconnects on its own when the
+    link errors out or stops delivering for `stall_sec`, and reports how
+    many samples the gap cost. Use it as a context manager.
+    """
+
+    def __init__(self, board, buffer_size=450000, stall_sec=2.0, retries=5, retry_delay=1.0):
+        self.board = board
+        self.speed = getattr(board, "speed", 1.0)
+        self.buffer_size = buffer_size
+        self.stall_sec = stall_sec
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.sfreq = BoardShim.get_sampling_rate(board.get_board_id())
+        self.is_open = False
+        self.reconnects = 0
+        self.gap_samples = 0   # samples estimated lost across all reconnects
+        self._last_data = None
+
+    def get_board_id(self):
+        return self.board.get_board_id()
+
+    def open(self):
+        if not self.board.is_prepared():
+            self.board.prepare_session()
+        self.board.start_stream(self.buffer_size)
+        self._last_data = time.monotonic()
+        self.is_open = True
+        return self
+
+    def close(self):
+        was_open, self.is_open = self.is_open, False
+        try:
+            if was_open:
+                self.board.stop_stream()
+        finally:
+            if self.board.is_prepared():
+                self.board.release_session()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def flush(self):
+        """Drop samples buffered while no stage was reading, e.g. between training and live prediction."""
+        self.board.get_board_data()
+        self._last_data = time.monotonic()
+
+    def get_board_data(self):
+        try:
+            data = self.board.get_board_data()
+        except BrainFlowError as e:
+            print(f"⚠️ Board link error: {e}")
+            return self.reconnect()
+        now = time.monotonic()
+        if data.shape[1]:
+            self._last_data = now
+        elif now - self._last_data > self.stall_sec / self.speed:
+            print(f"⚠️ No data for {now - self._last_data:.1f} s")
+            return self.reconnect()
+        return data
+
+    def reconnect(self):
+        """Reopen the session and return whatever the board has buffered since; raises once out of retries."""
+        lost_since = self._last_data
+        for attempt in range(1, self.retries + 1):
+            for call in (self.board.stop_stream, self.board.release_session):
+                try:
+                    call()
+                except BrainFlowError:
+                    pass  # the link is already gone
+            time.sleep(self.retry_delay * attempt)
+            try:
+                self.open()
+                break
+            except BrainFlowError as e:
+                print(f"✖ Reconnect attempt {attempt}/{self.retries} failed: {e}")
+        else:
+            self.is_open = False
+            raise ConnectionError(f"Board did not come back after {self.retries} attempts")
+
+        gap = int((time.monotonic() - lost_since) * self.sfreq * self.speed)
+        self.reconnects += 1
+        self.gap_samples += gap
+        print(f"✅ Board reconnected, about {gap} samples ({gap / self.sfreq:.1f} s) missing")
+        return self.board.get_board_data()
+
+    def stats(self):
+        return {"reconnects": self.reconnects, "gap_samples": self.gap_samples}
+
+
+@contextmanager
+def borrow(board):
+    """An open BoardConnection for `board`: the caller's if it already holds one, else one for this block only."""
+    conn = board if isinstance(board, BoardConnection) else BoardConnection(board)
+    if conn.is_open:
+        conn.flush()
+        yield conn
+    else:
+        with conn:
+            yield conn
@@ -0,0 +1,98 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+CACHE_DIR = "models/cache"
+MAX_BYTES = 2 * 1024 ** 3
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ContentCache:
+    """Content-addressed cache of arrays derived from input files.
+
+    Keys combine the SHA-256 of the input file with the parameters used to
+    process it, so an entry is reused exactly when neither changed. Entries
+    are .npy files; reads refresh their mtime and the least recently used
+    ones are evicted once the cache grows past `max_bytes`. The size is
+    scanned once and then kept as a running total, so it misses entries that
+    other processes add until the next eviction rescans the folder.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None  # bytes in the cache, scanned on the first put()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, path, **params):
+        return self.key_for(file_hash(path), **params)
+
+    def key_for(self, digest, **params):
+        """Key from an already computed file_hash(), for several entries derived from one file."""
+        params = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(f"{digest}:{params}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            value = np.load(path)
+            os.utime(path)  # mark as recently used
+        except (FileNotFoundError, ValueError, OSError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, value)
+        os.replace(tmp, path)
+        if self._size is None:
+            self.evict()
+            return
+        self._size += os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npy"):
+                try:
+                    st = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass  # another worker got there first
+            total -= size
+        self._size = total
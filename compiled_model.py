@@ -0,0 +1,159 @@
+import os
+import math
+import argparse
+import numpy as np
+
+FORMAT_VERSION = 1
+# front ends applied before the linear model, matching pipelines.py
+FEATURES = "features"          # input already is the feature vector (Welch band power models)
+LOG_VARIANCE = "log_variance"  # (bands x channels x samples) epoch -> log10 variance
+CSP_LOG_VARIANCE = "csp"       # spatial filters per band, then log10 variance
+
+
+class CompiledModel:
+    """A two-class linear model exported from sklearn, evaluated with numpy only.
+
+    Holds the optional epoch front end, the feature standardization and the
+    linear decision function; P(second class) is the logistic of the
+    decision, exactly what sklearn's LDA and LogisticRegression return.
+    proba() scores one input into buffers allocated on first use, so a live
+    tick builds no lists and runs no input validation. LDA models also keep
+    their means and covariance so OnlineLDA.from_lda() can adapt them.
+    """
+
+    def __init__(self, coef, intercept, classes, mean=None, scale=None, frontend=FEATURES, filters=None,
+                 means=None, covariance=None, priors=None):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(intercept)
+        self.classes_ = np.asarray(classes)
+        if len(self.classes_) != 2:
+            raise ValueError("Only two-class models can be compiled")
+        d = self.coef.size
+        self.mean = np.zeros(d) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.inv_scale = 1.0 / (np.ones(d) if scale is None else np.asarray(scale, dtype=np.float64))
+        self.frontend = frontend
+        self.filters = None if filters is None else np.ascontiguousarray(filters, dtype=np.float64)
+        self.means_ = means
+        self.covariance_ = covariance
+        self.priors_ = priors
+        self._shape = None
+        self._proba = np.zeros(2)
+        self._x = np.zeros(d)
+
+    @classmethod
+    def from_estimator(cls, clf):
+        """Compile a fitted LDA, LogisticRegression or one of the make_classifier() pipelines."""
+        from sklearn.preprocessing import StandardScaler
+        from pipelines import LogVariance, CSP
+
+        steps = [s for _, s in clf.steps] if hasattr(clf, "steps") else [clf]
+        *transforms, final = steps
+        kwargs = {"frontend": FEATURES}
+        for step in transforms:
+            if isinstance(step, LogVariance):
+                kwargs["frontend"] = LOG_VARIANCE
+            elif isinstance(step, CSP):
+                kwargs.update(frontend=CSP_LOG_VARIANCE, filters=step.filters_)
+            elif isinstance(step, StandardScaler):
+                kwargs.update(mean=step.mean_, scale=step.scale_)
+            else:
+                raise ValueError(f"Can't compile pipeline step {type(step).__name__}")
+        if getattr(final, "coef_", None) is None or len(final.classes_) != 2:
+            raise ValueError(f"Can't compile {type(final).__name__}, need a fitted two-class linear model")
+        if not transforms and getattr(final, "covariance_", None) is not None:
+            kwargs.update(means=final.means_, covariance=final.covariance_, priors=final.priors_)
+        return cls(final.coef_, np.ravel(final.intercept_)[0], final.classes_, **kwargs)
+
+    def save(self, path):
+        arrays = {"version": FORMAT_VERSION, "frontend": self.frontend, "classes": self.classes_,
+                  "coef": self.coef, "intercept": self.intercept, "mean": self.mean, "scale": 1.0 / self.inv_scale}
+        for name in ("filters", "means_", "covariance_", "priors_"):
+            value = getattr(self, name)
+            if value is not None:
+                arrays[name.rstrip("_")] = value
+        np.savez(path, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            if int(f["version"]) > FORMAT_VERSION:
+                raise ValueError(f"{path} was exported by a newer version (format {int(f['version'])})")
+            get = lambda name: f[name] if name in f.files else None
+            return cls(f["coef"], f["intercept"], f["classes"], f["mean"], f["scale"], str(f["frontend"]),
+                       get("filters"), get("means"), get("covariance"), get("priors"))
+
+    def _allocate(self, shape):
+        self._shape = shape
+        if self.frontend == CSP_LOG_VARIANCE:
+            self._projected = np.zeros((shape[0], self.filters.shape[1], shape[-1]))
+            self._power = np.zeros(self._projected.shape[:2])
+        elif self.frontend == LOG_VARIANCE:
+            self._power = np.zeros(shape[:2])
+
+    def proba(self, x):
+        """Class probabilities of one input, in a buffer that the next call overwrites."""
+        if self.frontend != FEATURES:
+            if x.shape != self._shape:
+                self._allocate(x.shape)
+            if self.frontend == CSP_LOG_VARIANCE:
+                x = np.einsum("bkc,bcs->bks", self.filters, x, out=self._projected)
+            np.var(x, axis=-1, out=self._power)
+            self._power += 1e-12
+            x = np.log10(self._power, out=self._power).reshape(-1)
+        np.subtract(x, self.mean, out=self._x)
+        self._x *= self.inv_scale
+        z = float(self._x @ self.coef) + self.intercept
+        # numerically stable logistic
+        p = 1.0 / (1.0 + math.exp(-z)) if z >= 0 else 1.0 - 1.0 / (1.0 + math.exp(z))
+        self._proba[0] = 1.0 - p
+        self._proba[1] = p
+        return self._proba
+
+    def predict_proba(self, X):
+        """(n x 2) class probabilities of a batch, like sklearn's."""
+        X = np.asarray(X, dtype=np.float64)
+        if self.frontend == CSP_LOG_VARIANCE:
+            X = np.einsum("bkc,nbcs->nbks", self.filters, X)
+        if self.frontend != FEATURES:
+            X = np.log10(np.var(X, axis=-1) + 1e-12).reshape(len(X), -1)
+        z = ((X - self.mean) * self.inv_scale) @ self.coef + self.intercept
+        p = 1.0 / (1.0 + np.exp(-np.clip(z, -500, 500)))
+        return np.stack([1.0 - p, p], axis=1)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def export_model(clf, path):
+    """Write the pickle-free .npz export of a fitted model; returns its path."""
+    return CompiledModel.from_estimator(clf).save(path)
+
+
+def compiled_path(model_path):
+    return os.path.splitext(model_path)[0] + ".npz"
+
+
+def main():
+    from registry import default_registry
+
+    parser = argparse.ArgumentParser(description="Export registered models to the pickle-free .npz format.")
+    parser.add_argument('models', nargs='*', help='model files, defaults to every registered model without one')
+    args = parser.parse_args()
+
+    registry = default_registry()
+    names = [os.path.basename(m) for m in args.models] or [
+        name for name, e in registry.entries.items() if not e.get("compiled") and not e.get("legacy")]
+    for name in names:
+        entry = registry.entries.get(name, {})
+        try:
+            path = export_model(registry.load(name, compiled=False), compiled_path(registry.path(name)))
+        except (ValueError, FileNotFoundError) as e:
+            print(f"✖ {name}: {e}")
+            continue
+        registry.register(name, **dict(entry, compiled=os.path.basename(path)))
+        print(f"✅ {name} -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import time
+from collections import deque
+import numpy as np
+import matplotlib.pyplot as plt
+from runtime import RingBuffer
+from streaming_filter import StreamingBandpass
+
+FPS = 30.0
+TRACE_SEC = 5.0
+HISTORY = 100  # decisions shown in the prediction history
+COLORS = {0: "green", 1: "blue"}
+
+
+def minmax_decimate(x, n_bins):
+    """Min/max envelope of (channels x samples) in `n_bins` columns, and the sample index of each point.
+
+    Plotting more points than the axes has pixels only costs time; keeping
+    each column's extremes still shows every spike and blink.
+    """
+    n = x.shape[-1]
+    k = n // max(n_bins, 1)
+    if k < 2:
+        return np.arange(n), x
+    skip = n - n_bins * k
+    blocks = x[:, skip:].reshape(x.shape[0], n_bins, k)
+    out = np.stack([blocks.min(axis=-1), blocks.max(axis=-1)], axis=-1).reshape(x.shape[0], -1)
+    index = skip + np.arange(n_bins).repeat(2) * k + np.tile([0, k - 1], n_bins)
+    return index, out
+
+
+class BlitView:
+    """Figure whose animated artists are redrawn over a cached background, one axes at a time.
+
+    Static parts (axes, ticks, labels) are rendered once per resize. A frame
+    restores and blits only the axes whose artists changed, and frames are
+    paced at `fps` independently of how often inference produces results.
+    """
+
+    def __init__(self, fig, fps=FPS):
+        self.fig = fig
+        self.period = 1.0 / fps
+        self.frames = 0
+        self._artists = {}  # axes -> animated artists drawn on it
+        self._backgrounds = None
+        self._next_frame = time.perf_counter()
+        fig.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def animate(self, ax, *artists):
+        for artist in artists:
+            artist.set_animated(True)
+        self._artists.setdefault(ax, []).extend(artists)
+
+    def show(self):
+        plt.show(block=False)
+        self.fig.canvas.draw()
+        self.fig.canvas.flush_events()
+
+    def until_next_frame(self):
+        return max(0.0, self._next_frame - time.perf_counter())
+
+    def frame_due(self):
+        return time.perf_counter() >= self._next_frame
+
+    def _on_draw(self, event):
+        # full redraw (first show, resize): cache every axes without its animated artists
+        canvas = self.fig.canvas
+        self._backgrounds = {ax: canvas.copy_from_bbox(ax.bbox) for ax in self._artists}
+        for ax, artists in self._artists.items():
+            for artist in artists:
+                ax.draw_artist(artist)
+
+    def blit(self, axes):
+        """Redraw the animated artists of `axes` only, then let the GUI process events."""
+        canvas = self.fig.canvas
+        if self._backgrounds is None:
+            canvas.draw()
+        else:
+            for ax in axes:
+                canvas.restore_region(self._backgrounds[ax])
+                for artist in self._artists[ax]:
+                    ax.draw_artist(artist)
+                canvas.blit(ax.bbox)
+        canvas.flush_events()
+        self.frames += 1
+        now = time.perf_counter()
+        self._next_frame = max(self._next_frame + self.period, now)
+
+    def close(self):
+        plt.close(self.fig)
+
+
+class CircleView(BlitView):
+    """The eye state circle: green for open, blue for closed, redrawn only when the state flips."""
+
+    def __init__(self, fps=FPS):
+        plt.ion()
+        fig, self.ax = plt.subplots()
+        self.circle = plt.Circle((0.5, 0.5), 0.3, color="gray")
+        self.ax.add_patch(self.circle)
+        self.ax.set_xlim(0, 1)
+        self.ax.set_ylim(0, 1)
+        self.ax.axis("off")
+        super().__init__(fig, fps)
+        self.animate(self.ax, self.circle)
+        self._pending = None  # (prediction, sample time) not yet drawn
+        self._shown = None
+        self.show()
+
+    def set_decision(self, prediction, confidence, alpha_power, sample_time):
+        self._pending = (prediction, sample_time)
+
+    def render(self, ring=None):
+        """Draw a frame; returns the sample time of a newly shown decision, or None."""
+        pending, self._pending = self._pending, None
+        if pending is None or pending[0] == self._shown:
+            self.blit(())
+            return None
+        self._shown = pending[0]
+        self.circle.set_color(COLORS.get(self._shown, "gray"))
+        self.blit((self.ax,))
+        return pending[1]
+
+
+class Dashboard(BlitView):
+    """Scrolling per-channel EEG, alpha power bars and prediction history.
+
+    Traces are band-passed (1-40 Hz) on the UI thread from the samples that
+    reached the ring buffer since the last frame, and decimated to the
+    pixel width of their axes before plotting.
+    """
+
+    def __init__(self, channel_names, sfreq, fps=FPS, seconds=TRACE_SEC, history=HISTORY):
+        self.names = list(channel_names)
+        self.sfreq = sfreq
+        n = len(self.names)
+        self.filter = StreamingBandpass(n, sfreq, 1.0, 40.0)
+        self.traces = RingBuffer(n, int(seconds * sfreq))
+        self.last = 0  # ring index of the first sample not yet filtered
+        self.scale = None
+        self.power_max = None
+        self.history = deque([0.5] * history, maxlen=history)
+        self._pending = None
+
+        plt.ion()
+        fig = plt.figure(figsize=(12, 7))
+        grid = fig.add_gridspec(2, 2, width_ratios=(3, 1))
+        self.ax_traces = fig.add_subplot(grid[:, 0])
+        self.ax_bars = fig.add_subplot(grid[0, 1])
+        self.ax_history = fig.add_subplot(grid[1, 1])
+
+        self.ax_traces.set_xlim(-seconds, 0)
+        self.ax_traces.set_ylim(-n, 1)
+        self.ax_traces.set_yticks(-np.arange(n), [str(c) for c in self.names])
+        self.ax_traces.set_xlabel("s")
+        self.ax_traces.set_title("EEG, 1-40 Hz")
+        # antialiasing thin, dense traces costs more than it shows
+        self.lines = [self.ax_traces.plot([], [], lw=0.7, antialiased=False)[0] for _ in range(n)]
+
+        self.bars = list(self.ax_bars.bar(np.arange(n), np.zeros(n), color="tab:purple"))
+        self.ax_bars.set_xticks(np.arange(n), [str(c) for c in self.names], fontsize=7)
+        self.ax_bars.set_ylim(0, 1)
+        self.ax_bars.set_title("alpha power (relative)")
+
+        x = np.arange(1 - history, 1)
+        self.ax_history.axhline(0.5, color="gray", lw=0.5)
+        self.prob_line, = self.ax_history.plot(x, list(self.history), color="black", lw=1)
+        self.ax_history.set_xlim(x[0], 0)
+        self.ax_history.set_ylim(0, 1)
+        self.ax_history.set_ylabel("P(closed)")
+        self.ax_history.set_xlabel("decisions")
+        self.state = self.ax_history.text(0.02, 0.9, "", transform=self.ax_history.transAxes, fontweight="bold")
+        fig.tight_layout()
+
+        super().__init__(fig, fps)
+        self.animate(self.ax_traces, *self.lines)
+        self.animate(self.ax_bars, *self.bars)
+        self.animate(self.ax_history, self.prob_line, self.state)
+        self.show()
+
+    def set_decision(self, prediction, confidence, alpha_power, sample_time):
+        self._pending = (prediction, confidence, np.asarray(alpha_power), sample_time)
+
+    def _update_traces(self, ring):
+        stop = ring.written
+        start = max(self.last, stop - self.traces.capacity)
+        if stop > start:
+            self.traces.write(self.filter.process(ring.view(start, stop)[:len(self.names)]))
+        self.last = stop
+        n = min(self.traces.written, self.traces.capacity)
+        if n < 2:
+            return False
+
+        # a min and a max per pair of pixel columns: about one point per column
+        index, y = minmax_decimate(self.traces.latest(n), int(self.ax_traces.bbox.width) // 2)
+        t = (index - n) / self.sfreq
+        # one channel's lane is as tall as a typical trace, smoothed so it doesn't jump each frame
+        spread = float(np.median(np.ptp(y, axis=1))) or 1.0
+        self.scale = spread if self.scale is None else 0.95 * self.scale + 0.05 * spread
+        for i, line in enumerate(self.lines):
+            line.set_data(t, y[i] / self.scale - i)
+        return True
+
+    def _update_decision(self):
+        pred, confidence, power, _ = self._pending
+        self.power_max = power.max() if self.power_max is None else max(0.99 * self.power_max, power.max())
+        for bar, p in zip(self.bars, power / max(self.power_max, 1e-12)):
+            bar.set_height(p)
+        self.history.append(confidence if pred == 1 else 1.0 - confidence)
+        self.prob_line.set_ydata(list(self.history))
+        self.state.set_text(f"eyes {'closed' if pred == 1 else 'open'} {confidence:.0%}")
+        self.state.set_color(COLORS.get(pred, "black"))
+
+    def render(self, ring):
+        """Draw a frame; returns the sample time of a newly shown decision, or None."""
+        changed = []
+        if self._update_traces(ring):
+            changed.append(self.ax_traces)
+        shown = None
+        if self._pending is not None:
+            self._update_decision()
+            shown = self._pending[3]
+            self._pending = None
+            changed += [self.ax_bars, self.ax_history]
+        self.blit(changed)
+        return shown
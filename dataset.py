@@ -0,0 +1,217 @@
+import os
+import glob
+import json
+import numpy as np
+from brainflow.board_shim import BoardShim, BoardIds
+from board_source import load_recording, accel_rows
+from cache import file_hash
+from features import epoch_view, epoch_features, epoch_samples, feature_params
+from recorder import read_meta, is_session, load_segment, write_meta
+
+INDEX_FILE = "index.jsonl"
+LABELS = {"open": 0, "closed": 1}
+
+
+def channel_rows(channels):
+    """Row selector for `channels`: a slice (so memmaps stay views) when they are contiguous."""
+    if len(channels) and list(channels) == list(range(channels[0], channels[-1] + 1)):
+        return slice(channels[0], channels[-1] + 1)
+    return list(channels)
+
+
+def accel_channels(record):
+    """Accelerometer rows of a record, looked up from its board for records indexed before they were stored."""
+    if "accel_channels" in record:
+        return record["accel_channels"]
+    return accel_rows(record["board_id"]) or None
+
+
+def legacy_session_dir(path, root_dir):
+    label, _, stamp = os.path.splitext(os.path.basename(path))[0].partition("_")
+    return os.path.join(root_dir, f"session_{stamp}_{label}")
+
+
+def import_csv(path, root_dir, board_id=BoardIds.CYTON_BOARD.value, move=False):
+    """Convert a legacy open_/closed_ CSV into a one-segment session folder.
+
+    The CSV stays where it is unless `move`, then it goes into the session
+    folder. The session's meta.json names it as the source, so replaying the
+    data folder skips a CSV that is also imported.
+    """
+    label, _, stamp = os.path.splitext(os.path.basename(path))[0].partition("_")
+    session_dir = legacy_session_dir(path, root_dir)
+    os.makedirs(session_dir, exist_ok=True)
+    data = load_recording(path)
+    np.save(os.path.join(session_dir, "seg_0000.npy"), data)
+    write_meta(session_dir, {
+        "created": stamp,
+        "subject": None,
+        "board_id": board_id,
+        "board": BoardShim.get_board_descr(board_id),
+        "dtype": data.dtype.name,
+        "source": os.path.basename(path),
+        "segments": [{"label": label if label in LABELS else None, "round": 0,
+                      "file": "seg_0000.npy", "samples": data.shape[1]}],
+    })
+    if move:
+        os.replace(path, os.path.join(session_dir, os.path.basename(path)))
+    return session_dir
+
+
+class DatasetCatalog:
+    """Index of every recorded segment under a training data folder.
+
+    One JSON line per segment in index.jsonl (session, segment file, label,
+    round, timestamp, subject, board id, EEG channel layout, sampling rate,
+    sample count). update() only appends segments it hasn't seen yet, and
+    data is served from memory-mapped .npy segments.
+    """
+
+    def __init__(self, root_dir="models/training_data"):
+        self.root_dir = root_dir
+        self.index_path = os.path.join(root_dir, INDEX_FILE)
+        self.records = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.records = [json.loads(line) for line in f if line.strip()]
+
+    def update(self, move=False):
+        """Index new sessions and segments (and import legacy CSVs, see import_csv); returns the new records."""
+        os.makedirs(self.root_dir, exist_ok=True)
+        imported = {r.get("source") for r in self.records}
+        for path in glob.glob(os.path.join(self.root_dir, "*.csv")):
+            if os.path.basename(path) not in imported:
+                import_csv(path, self.root_dir, move=move)
+
+        seen = {(r["session"], r["file"]) for r in self.records}
+        new = []
+        for session_dir in sorted(glob.glob(os.path.join(self.root_dir, "session_*"))):
+            if not is_session(session_dir):
+                continue
+            session = os.path.basename(session_dir)
+            meta = read_meta(session_dir)
+            for segment in meta["segments"]:
+                if (session, segment["file"]) in seen:
+                    continue
+                new.append({
+                    "session": session,
+                    "file": segment["file"],
+                    "label": segment.get("label"),
+                    "round": segment.get("round"),
+                    "timestamp": meta["created"],
+                    "subject": meta.get("subject"),
+                    "source": meta.get("source"),
+                    "board_id": meta["board_id"],
+                    "eeg_channels": meta["board"]["eeg_channels"],
+                    "accel_channels": meta["board"].get("accel_channels"),
+                    "n_rows": meta["board"]["num_rows"],
+                    "sfreq": meta["board"]["sampling_rate"],
+                    "samples": segment["samples"],
+                })
+
+        if new:
+            with open(self.index_path, "a") as f:
+                for record in new:
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self.records.extend(new)
+        return new
+
+    def select(self, label=None, subject=None, board_id=None, sfreq=None, since=None, until=None):
+        """Filter records; `label` may be one label or a collection, timestamps are YYYYmmdd_HHMMSS."""
+        labels = {label} if isinstance(label, str) else label
+        return [
+            r for r in self.records
+            if (labels is None or r["label"] in labels)
+            and (subject is None or r["subject"] == subject)
+            and (board_id is None or r["board_id"] == board_id)
+            and (sfreq is None or r["sfreq"] == sfreq)
+            and (since is None or r["timestamp"] >= since)
+            and (until is None or r["timestamp"] <= until)
+        ]
+
+    def load(self, record):
+        """Memory-mapped (rows x samples) array of one record."""
+        return load_segment(os.path.join(self.root_dir, record["session"]), record)
+
+    def epochs(self, record, **epoch_kwargs):
+        """Strided (epochs x channels x samples) view of a record's EEG rows, still memory-mapped."""
+        eeg = self.load(record)[channel_rows(record["eeg_channels"])]
+        return epoch_view(eeg, record["sfreq"], **epoch_kwargs)
+
+    def accel_epochs(self, record, **epoch_kwargs):
+        """Accelerometer rows epoched like epochs(), or None for boards without them."""
+        channels = accel_channels(record)
+        if not channels:
+            return None
+        return epoch_view(self.load(record)[channel_rows(channels)], record["sfreq"], **epoch_kwargs)
+
+    def recordings(self, records):
+        """Memory-mapped EEG and accelerometer rows of every labelled record, with labels and round groups.
+
+        Accelerometer entries are None for boards without one.
+        """
+        eeg, accel, y, groups, rounds = [], [], [], [], {}
+        for record in records:
+            if record["label"] not in LABELS:
+                continue
+            data = self.load(record)
+            eeg.append(data[channel_rows(record["eeg_channels"])])
+            channels = accel_channels(record)
+            accel.append(data[channel_rows(channels)] if channels else None)
+            y.append(LABELS[record["label"]])
+            groups.append(rounds.setdefault((record["session"], record["round"]), len(rounds)))
+        return eeg, accel, np.array(y), np.array(groups)
+
+    def segment_path(self, record):
+        return os.path.join(self.root_dir, record["session"], record["file"])
+
+    def features(self, records, cache=None, detector=None, **epoch_kwargs):
+        """Classifier features, labels and recording-round groups for `records`.
+
+        Segments are featurized one at a time, so only one segment's pages are
+        touched at once no matter how many months of sessions are selected.
+        With a ContentCache, segments whose file and feature parameters are
+        unchanged are served from the cache instead of being recomputed.
+        With an ArtifactDetector, flagged epochs are dropped; an unfitted one
+        is first fitted on all selected epochs.
+        """
+        X, y, groups, measures, rounds = [], [], [], [], {}
+        for record in records:
+            if record["label"] not in LABELS:
+                continue
+            if record["samples"] < epoch_samples(record["sfreq"], **epoch_kwargs)[0]:
+                continue
+            compute = lambda: epoch_features(self.epochs(record, **epoch_kwargs), record["sfreq"])
+            measure = lambda: detector.measure(self.epochs(record, **epoch_kwargs),
+                                               self.accel_epochs(record, **epoch_kwargs))
+            if cache is None:
+                feats = compute()
+                if detector is not None:
+                    measures.append(measure())
+            else:
+                digest = file_hash(self.segment_path(record))  # once, shared by both cache keys
+                params = dict(feature_params(record["sfreq"], **epoch_kwargs), eeg_channels=record["eeg_channels"])
+                feats = cache.get_or_compute(cache.key_for(digest, stage="features", **params), compute)
+                if detector is not None:
+                    key = cache.key_for(digest, stage="artifact_measures", accel_channels=accel_channels(record),
+                                        **params)
+                    measures.append(cache.get_or_compute(key, measure))
+            # open and closed halves of the same round share a group
+            group = rounds.setdefault((record["session"], record["round"]), len(rounds))
+            X.append(feats)
+            y.append(np.full(len(feats), LABELS[record["label"]]))
+            groups.append(np.full(len(feats), group))
+        if not X:
+            raise ValueError("No records long enough to cut a single epoch")
+        if len({x.shape[1] for x in X}) > 1:
+            raise ValueError("Selected records have different channel layouts")
+        X, y, groups = np.concatenate(X), np.concatenate(y), np.concatenate(groups)
+        if detector is None:
+            return X, y, groups
+
+        measures = np.concatenate(measures)
+        if not detector.fitted:
+            detector.fit_measures(measures)
+        keep = detector.clean_from(measures)
+        print(f"Dropped {np.count_nonzero(~keep)} of {keep.size} epochs with artifacts")
+        return X[keep], y[keep], groups[keep]
@@ -0,0 +1,83 @@
+import math
+import numpy as np
+
+METHODS = ("ema", "hmm")
+
+
+class DecisionFilter:
+    """Stable eye state from a stream of per-window class probabilities.
+
+    A rolling posterior of the second class is updated from every window,
+    either as an exponential moving average with time constant `tau` s
+    ("ema") or by two-state HMM forward filtering ("hmm"), where states
+    last `mean_dwell` s on average. Overlapping windows aren't independent
+    observations, so the HMM weighs each one by the time since the last,
+    a full observation per `evidence_sec`. The classifier's probability is
+    clipped to `max_confidence`, so a single window can't flip the state.
+    The reported state changes only when the posterior crosses `threshold`
+    towards the other state and the current one has held for `min_dwell` s.
+    Times are board time, so replay speed and inference rate don't change
+    the behavior.
+    """
+
+    def __init__(self, classes, method="hmm", threshold=0.75, min_dwell=0.5, tau=0.5, mean_dwell=4.0,
+                 evidence_sec=0.25, max_confidence=0.95):
+        if method not in METHODS:
+            raise ValueError(f"Unknown smoothing {method!r}, expected one of {METHODS}")
+        if not 0.5 < threshold < 1.0:
+            raise ValueError("threshold must be between 0.5 and 1")
+        self.classes = np.asarray(classes)
+        self.method = method
+        self.threshold = threshold
+        self.min_dwell = min_dwell
+        self.tau = tau
+        self.mean_dwell = mean_dwell
+        self.evidence_sec = evidence_sec
+        self.max_confidence = max_confidence
+        self.posterior = 0.5    # P(second class)
+        self.state = None       # index into classes, None until the first confirmed state
+        self.transitions = 0
+        self.raw_switches = 0   # flips of the unsmoothed argmax, for comparison
+        self._raw = None
+        self._t = None
+        self._since = None      # time of the last transition
+
+    def stats(self):
+        return {"transitions": self.transitions, "raw_switches": self.raw_switches}
+
+    def update(self, proba, t):
+        """Fold in one window's probabilities at board time `t` (s).
+
+        Returns (class, posterior of that class) of the confirmed state, or
+        None until the posterior first leaves the undecided band.
+        """
+        raw = int(proba[1] > proba[0])
+        self.raw_switches += self._raw is not None and raw != self._raw
+        self._raw = raw
+
+        q = min(max(float(proba[1]), 1.0 - self.max_confidence), self.max_confidence)
+        dt = 0.0 if self._t is None else max(t - self._t, 0.0)
+        p = self.posterior
+        if self.method == "ema":
+            a = 1.0 if self._t is None else 1.0 - math.exp(-dt / self.tau)
+            p += a * (q - p)
+        else:
+            # predict: the state may have switched since the last window, then weigh in the observation
+            switch = 0.5 * (1.0 - math.exp(-2.0 * dt / self.mean_dwell))
+            p = p * (1.0 - switch) + (1.0 - p) * switch
+            weight = 1.0 if self._t is None else min(dt / self.evidence_sec, 1.0)
+            log_odds = math.log(p / (1.0 - p)) + weight * math.log(q / (1.0 - q))
+            p = 1.0 / (1.0 + math.exp(-log_odds))
+        self.posterior = p
+        self._t = t
+
+        # hysteresis: leaving a state takes a posterior past the threshold on the other side
+        target = 1 if p >= self.threshold else 0 if p <= 1.0 - self.threshold else None
+        if target is not None and target != self.state:
+            if self.state is None or t - self._since >= self.min_dwell:
+                self.transitions += self.state is not None
+                self.state = target
+                self._since = t
+        if self.state is None:
+            return None
+        return self.classes[self.state], p if self.state == 1 else 1.0 - p
@@ -0,0 +1,93 @@
+import json
+import hashlib
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import butter, sosfiltfilt, welch
+
+FEATURE_NAMES = ("band_power", "rms", "variance")
+BAND_POWER, RMS, VARIANCE = range(len(FEATURE_NAMES))
+
+# Classifier features: log Welch band power per channel, on 1 s epochs every 0.25 s
+BANDS = (("theta", 4.0, 8.0), ("alpha", 8.0, 12.0), ("beta", 12.0, 30.0))
+EPOCH_SEC = 1.0
+HOP_SEC = 0.25
+
+# Feature methods a model can be trained on, recorded in its registry entry
+WELCH = "welch_log_band_power"     # epoch_features() of raw epochs
+FILTER_BANK = "filter_bank_epochs"  # causally band-passed (bands x channels x samples) epochs
+
+
+def band_sos(sfreq, low=8.0, high=12.0, order=4):
+    return butter(order, [low, high], btype="band", fs=sfreq, output="sos")
+
+
+def block_features(block, sos=None, filtered=None):
+    """Compute per-channel features for a whole (channels x samples) block at once.
+
+    Returns a (channels x len(FEATURE_NAMES)) matrix. Band power is the mean
+    square of the band-passed signal: pass `sos` to filter the block here
+    (zero-phase, along axis 1) or `filtered` if it was already filtered
+    upstream, e.g. by a StreamingBandpass. RMS and variance use the raw block.
+    """
+    n_channels, n_samples = block.shape
+    out = np.empty((n_channels, len(FEATURE_NAMES)))
+    if n_samples == 0:
+        out.fill(np.nan)
+        return out
+
+    if filtered is None:
+        filtered = sosfiltfilt(sos, block, axis=1) if sos is not None else block
+
+    # einsum reduces the squares without materialising block ** 2
+    out[:, BAND_POWER] = np.einsum("ij,ij->i", filtered, filtered) / n_samples
+    out[:, VARIANCE] = np.var(block, axis=1)
+    out[:, RMS] = np.sqrt(out[:, VARIANCE] + np.mean(block, axis=1) ** 2)
+    return out
+
+
+def feature_params(sfreq, bands=BANDS, epoch_sec=EPOCH_SEC, hop_sec=HOP_SEC, method=WELCH):
+    """Everything that determines what a model's input looks like, as plain JSON types."""
+    return {"method": method, "sfreq": sfreq,
+            "bands": [list(b) for b in bands], "epoch_sec": epoch_sec, "hop_sec": hop_sec}
+
+
+def feature_signature(sfreq, eeg_channels, **kwargs):
+    """Short hash of the feature pipeline and channel layout a model was trained on."""
+    params = dict(feature_params(sfreq, **kwargs), eeg_channels=[int(c) for c in eeg_channels])
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def epoch_samples(sfreq, epoch_sec=EPOCH_SEC, hop_sec=HOP_SEC):
+    return int(round(epoch_sec * sfreq)), max(1, int(round(hop_sec * sfreq)))
+
+
+def epoch_view(block, sfreq, epoch_sec=EPOCH_SEC, hop_sec=HOP_SEC):
+    """Cut (..., channels, samples) into overlapping epochs without copying.
+
+    Returns a strided view of shape (..., epochs, channels, epoch_samples).
+    """
+    size, hop = epoch_samples(sfreq, epoch_sec, hop_sec)
+    windows = sliding_window_view(block, size, axis=-1)[..., ::hop, :]
+    return np.moveaxis(windows, -2, -3)
+
+
+def welch_band_powers(epochs, sfreq, bands=BANDS):
+    """Band power of every (..., channels, samples) epoch from one batched Welch PSD."""
+    freqs, psd = welch(epochs, fs=sfreq, nperseg=epochs.shape[-1] // 2, axis=-1)
+    df = freqs[1] - freqs[0]
+    out = np.empty(psd.shape[:-1] + (len(bands),))
+    for i, (_, low, high) in enumerate(bands):
+        lo, hi = np.searchsorted(freqs, [low, high])
+        np.sum(psd[..., lo:hi], axis=-1, out=out[..., i])
+    out *= df
+    return out
+
+
+def epoch_features(epochs, sfreq, bands=BANDS):
+    """Classifier feature vector(s): log band power of every channel and band.
+
+    Used by both training and live prediction so the two always agree.
+    Input is (..., channels, samples), output is (..., channels * len(bands)).
+    """
+    powers = welch_band_powers(epochs, sfreq, bands)
+    return np.log10(powers + 1e-12).reshape(powers.shape[:-2] + (-1,))
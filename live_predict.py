@@ -1,79 +1,329 @@
 # live_predict.py
+import os
 import time
-import pickle
 import numpy as np
-import matplotlib.pyplot as plt
-from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds
-from brainflow.data_filter import DataFilter, FilterTypes
-from utils import speak
+from brainflow.board_shim import BoardShim
+from adaptive import OnlineLDA
+from artifacts import ArtifactDetector, REASONS
+from board_source import open_board, borrow, accel_rows
+from dataset import LABELS
+from decision import DecisionFilter
+from features import FILTER_BANK, epoch_features, epoch_samples, feature_params, feature_signature
+from metrics import Metrics
+from publisher import decision_message
+from registry import default_registry
+from runtime import RingBuffer, LatestValue, AcquisitionThread, InferenceWorker, runtime_stats
+from session_log import SessionLog
+from signal_quality import SignalQuality, QualityMonitor
+from streaming_filter import StreamingBandpass, FilterBank
+from utils import speak, announce
 
-def run_live_prediction(model_path):
+TICK_STAGES = ("filter", "artifacts", "features", "predict", "adapt")  # timed on the inference thread
+CALIBRATION_PROMPTS = {"open": "Calibration. Keep your eyes open.", "closed": "Calibration. Close your eyes."}
+
+class LivePredictor:
+    """Inference step: streaming alpha filter on new samples, classifier on the latest epoch.
+
+    `params` are the model's feature parameters from the registry. Filter-bank
+    models get the same causal band-pass training used, streamed into a ring
+    of their own. With `adaptive=True` the classifier is an OnlineLDA updated
+    every tick, from calibration prompts when one is active and otherwise from
+    its own predictions when they are at least `confidence` sure. With a
+    DecisionFilter as `smoother`, decisions are its confirmed state rather
+    than each window's own prediction.
+    """
+
+    def __init__(self, clf, sfreq, n_eeg, metrics, params=None, adaptive=False, confidence=0.9, self_rate=0.25,
+                 detector=None, n_accel=0, smoother=None):
+        # ring rows: EEG channels, then n_accel accelerometer rows, then the board timestamp
+        self.clf = OnlineLDA.from_lda(clf) if adaptive else clf
+        # compiled models score one window in preallocated buffers, pickled sklearn ones want a batch
+        self._proba = getattr(clf, "proba", None) or (lambda x: clf.predict_proba(x[None])[0])
+        self.adaptive = adaptive
+        self.confidence = confidence
+        self.self_rate = self_rate
+        self.sfreq = sfreq
+        self.n_eeg = n_eeg
+        self.metrics = metrics
+        self.params = params or feature_params(sfreq)
+        self.window_size, _ = epoch_samples(sfreq, self.params["epoch_sec"], self.params["hop_sec"])
+        self.alpha_filter = StreamingBandpass(n_eeg, sfreq, 8.0, 12.0, 4)
+        self.bank = None
+        if self.params["method"] == FILTER_BANK:
+            self.bank = FilterBank(n_eeg, sfreq, self.params["bands"])
+            self.filtered = RingBuffer(len(self.params["bands"]) * n_eeg, self.window_size)
+        self.detector = detector  # windows it flags are never classified
+        self.smoother = smoother
+        self.n_accel = n_accel
+        self.rejected = dict.fromkeys(REASONS, 0)
+        self.last = 0  # ring index of the first sample not yet filtered
+        self.calibration = None  # (label, first sample, end sample) of the current prompt
+        self.calibration_updates = 0
+        self.self_updates = 0
+
+    def stats(self):
+        stats = {f"artifacts_{reason}": n for reason, n in self.rejected.items()} if self.detector else {}
+        if self.adaptive:
+            stats.update(calibration_updates=self.calibration_updates, self_updates=self.self_updates)
+        if self.smoother is not None:
+            stats.update(self.smoother.stats())
+        return stats
+
+    def calibrate(self, label, ring, seconds=3.0, reaction=1.5):
+        """Label the windows recorded `reaction` s from now for `seconds` as `label`."""
+        start = ring.written + int(reaction * self.sfreq) + self.window_size
+        self.calibration = (label, start, start + int(seconds * self.sfreq))
+
+    def _adapt(self, features, stop):
+        proba = self.clf.predict_proba(features)
+        cal = self.calibration
+        if cal is not None and cal[1] <= stop <= cal[2]:
+            self.clf.update(features, cal[0])
+            self.calibration_updates += 1
+        elif proba.max() >= self.confidence:
+            self.clf.update(features, self.clf.classes_[proba.argmax()], rate=self.self_rate)
+            self.self_updates += 1
+        return proba
+
+    def window(self, ring):
+        """Filter the samples that arrived since the last call.
+
+        Returns (model input, ring index, sample time) of the latest epoch,
+        or None until a full epoch is buffered or while it has artifacts.
+        """
+        stop = ring.written
+        if stop == self.last:
+            return None
+
+        start = max(self.last, stop - ring.capacity)
+        with self.metrics.time("filter"):
+            block = ring.view(start, stop)[:self.n_eeg]
+            self.alpha_filter.process(block)
+            if self.bank is not None:
+                self.filtered.write(self.bank.process(block).reshape(-1, block.shape[1]))
+        self.last = stop
+        if stop < self.window_size:
+            return None
+
+        raw = ring.view(stop - self.window_size, stop)
+        if self.detector is not None:
+            # hold the last decision rather than classify a blink or a head movement
+            with self.metrics.time("artifacts"):
+                flags = self.detector.flags(raw[:self.n_eeg], raw[self.n_eeg:self.n_eeg + self.n_accel]
+                                            if self.n_accel else None)
+            if flags.any():
+                for reason in np.flatnonzero(flags):
+                    self.rejected[REASONS[reason]] += 1
+                return None
+
+        sample_time = raw[-1, -1]
+        if self.bank is not None:
+            # band-passed epoch, already filtered sample by sample above
+            epoch = self.filtered.latest(self.window_size).reshape(-1, self.n_eeg, self.window_size)
+        else:
+            # raw EEG, the classifier sees exactly what training saw
+            epoch = raw[:self.n_eeg]
+        return epoch, stop, sample_time
+
+    def featurize(self, epochs):
+        """Classifier input for a batch of epochs from window()."""
+        if self.bank is not None:
+            return epochs
+        return epoch_features(epochs, self.sfreq, self.params["bands"])
+
+    def decide(self, proba, stop):
+        """(class, confidence) for the window ending at ring index `stop`, None while the smoother is undecided."""
+        if self.smoother is None:
+            k = proba.argmax()
+            return self.clf.classes_[k], proba[k]
+        return self.smoother.update(proba, stop / self.sfreq)
+
+    def step(self, ring):
+        latest = self.window(ring)
+        if latest is None:
+            return None
+        epoch, stop, sample_time = latest
+        with self.metrics.time("features"):
+            features = self.featurize(epoch[None])
+        if self.adaptive:
+            with self.metrics.time("adapt"):
+                proba = self._adapt(features[0], stop)
+        else:
+            with self.metrics.time("predict"):
+                proba = self._proba(features[0])
+        decision = self.decide(proba, stop)
+        if decision is None:
+            return None
+        self.metrics.observe("sample_to_decision", time.time() - sample_time)
+        return decision[0], decision[1], self.alpha_filter.power.copy(), sample_time
+
+def load_model(model_path, board_id):
+    """Load a registered model with its feature parameters and artifact detector.
+
+    Models with a .npz export load as a CompiledModel, without sklearn.
+
+    Refuses models trained on a different feature pipeline or channel layout.
+    Models saved before artifact rejection get an unfitted detector that only
+    applies the absolute limits.
+    """
+    sfreq = BoardShim.get_sampling_rate(board_id)
+    eeg_channels = BoardShim.get_eeg_channels(board_id)
+    registry = default_registry()
+    registry.sync()
+    entry = registry.entries.get(os.path.basename(model_path), {})
+    params = entry.get("features") or feature_params(sfreq)
+    layout = {k: params[k] for k in ("bands", "epoch_sec", "hop_sec", "method")}
+    clf = registry.load(model_path, signature=feature_signature(sfreq, eeg_channels, **layout))
+    artifacts = entry.get("artifacts")
+    detector = ArtifactDetector.from_state(artifacts) if artifacts else ArtifactDetector.for_board(board_id)
+    return clf, params, detector
+
+def ring_rows(board_id):
+    """Board rows the live ring keeps: EEG, accelerometer (if any), timestamp last."""
+    accel_channels = accel_rows(board_id)
+    eeg_channels = BoardShim.get_eeg_channels(board_id)
+    return eeg_channels, accel_channels, eeg_channels + accel_channels + [BoardShim.get_timestamp_channel(board_id)]
+
+def run_live_prediction(model_path, board=None, update_hz=10.0, buffer_sec=10,
+                        metrics_path=None, report_every=10.0, adaptive=False, calibrate_every=None,
+                        publishers=(), ui=True, reject_artifacts=True, log_path=None, summary_every=1.0,
+                        dashboard=False, fps=30.0, smoothing=None, hysteresis=0.75, min_dwell=0.5):
+    """Live eye state detection until Ctrl+C.
+
+    Every decision is sent to the started `publishers` straight from the
+    inference thread; they are stopped when the session ends. The UI is the
+    eye state circle, or with dashboard=True live traces, alpha power and
+    prediction history, both drawn at `fps`. With ui=False nothing is drawn
+    and publishers are the only visual output. Windows with
+    artifacts produce no decision unless reject_artifacts=False. A signal
+    quality monitor warns about degrading channels throughout. An open
+    BoardConnection passed as `board` stays open for the caller. Every
+    decision, with the time each stage took for it, goes to a SessionLog, a
+    JSONL file with `log_path`, and the console gets one summary line every
+    `summary_every` s instead of a print per tick.
+    With `smoothing` ("ema" or "hmm") decisions go through a DecisionFilter
+    with the given `hysteresis` threshold and `min_dwell` s, so a high
+    `update_hz` gives fast but stable decisions. Every change of the decided
+    state is logged as a "transition" event.
+    """
     speak("Loading model for live prediction.")
-    with open(model_path, "rb") as f:
-        clf = pickle.load(f)
-
-    # Board setup
-    params = BrainFlowInputParams()
-    params.serial_port = "/dev/cu.usbserial-DP04VYIJ"
-    board = BoardShim(BoardIds.CYTON_BOARD.value, params)
-    board.prepare_session()
-    board.start_stream()
-
-    sfreq = BoardShim.get_sampling_rate(BoardIds.CYTON_BOARD.value)
-    eeg_channels = BoardShim.get_eeg_channels(BoardIds.CYTON_BOARD.value)
-
-    # Visualization setup
-    plt.ion()
-    fig, ax = plt.subplots()
-    circle = plt.Circle((0.5, 0.5), 0.3, color="gray")
-    ax.add_patch(circle)
-    ax.set_xlim(0, 1)
-    ax.set_ylim(0, 1)
-    ax.axis("off")
-
-    speak("Starting live eye state detection. Press Control + C to stop.")
-
-    try:
-        while True:
-            # Collect about 1 second of EEG data
-            data = board.get_current_board_data(256)
-            alpha_powers = []
-
-            # Compute alpha power across all EEG channels
-            for ch in eeg_channels:
-                signal = data[ch, :]
-                DataFilter.perform_bandpass(signal, sfreq, 8.0, 12.0, 4,
-                                            FilterTypes.BUTTERWORTH.value, 0)
-                power = np.mean(signal ** 2)
-                alpha_powers.append(power)
-
-            # Use mean alpha power (or modify to use first channel only)
-            avg_power = np.mean(alpha_powers)
-            pred = clf.predict([[avg_power]])[0]
-
-            # Visual & audio feedback
-            if pred == 0:
-                circle.set_color("green")
-                state = "Eyes open"
-            else:
-                circle.set_color("blue")
-                state = "Eyes closed"
-
-            fig.canvas.draw()
-            fig.canvas.flush_events()
-
-            # Print diagnostics
-            print("─" * 50)
-            print(f"Prediction: {state.upper()}")
-            for i, power in enumerate(alpha_powers):
-                print(f"  Channel {eeg_channels[i]} alpha power: {power:.6f}")
-            print("─" * 50)
-
-            speak(state)
-            time.sleep(1)
-
-    except KeyboardInterrupt:
-        board.stop_stream()
-        board.release_session()
-        plt.close(fig)
-        speak("Session ended.")
+    board = board or open_board()
+    board_id = board.get_board_id()
+    sfreq = BoardShim.get_sampling_rate(board_id)
+    eeg_channels, accel_channels, rows = ring_rows(board_id)
+
+    clf, params, detector = load_model(model_path, board_id)
+
+    # Acquisition → ring buffer → inference at a fixed cadence → latest result for the UI.
+    # The predictor rejects models it can't run (e.g. --adaptive on a CSP pipeline) before the board opens
+    metrics = Metrics()
+    ring = RingBuffer(len(rows), buffer_sec * sfreq)
+    results = LatestValue()
+    smoother = DecisionFilter(clf.classes_, smoothing, hysteresis, min_dwell) if smoothing else None
+    predictor = LivePredictor(clf, sfreq, len(eeg_channels), metrics, params, adaptive=adaptive,
+                              detector=detector if reject_artifacts else None, n_accel=len(accel_channels),
+                              smoother=smoother)
+
+    # Board setup, unless the caller already holds an open BoardConnection; released however the session ends
+    with borrow(board) as conn:
+        acquisition = AcquisitionThread(conn, ring, rows, metrics=metrics)
+        monitor = QualityMonitor(SignalQuality.for_board(board_id, len(eeg_channels), sfreq, names=eeg_channels),
+                                 slice(0, len(eeg_channels)), voice=True, metrics=metrics)
+
+        def step(ring):
+            result = predictor.step(ring)
+            if result is None:
+                return None
+            # every decision (and state transition) is logged here, the UI loop only sees the newest one
+            with metrics.time("log"):
+                log.decision(board_name, *result, stages={s: metrics.last[s] for s in TICK_STAGES if s in metrics.last})
+            if publishers:
+                msg = decision_message(board_name, *result)
+                for publisher in publishers:
+                    publisher.publish(msg)
+            return result
+
+        board_name = BoardShim.get_board_descr(board_id)["name"]
+        log = SessionLog(log_path, summary_every)
+        log.event("start", board=board_name, model=model_path, sfreq=sfreq, eeg_channels=list(eeg_channels),
+                  adaptive=adaptive, reject_artifacts=reject_artifacts, smoothing=smoothing)
+        worker = InferenceWorker(ring, step, update_hz * getattr(board, "speed", 1.0), results)
+
+        # Visualization setup
+        view = None
+        if ui:
+            from dashboard import CircleView, Dashboard  # headless sessions never load matplotlib
+
+            view = Dashboard(eeg_channels, sfreq, fps) if dashboard else CircleView(fps)
+
+        speak("Starting live eye state detection. Press Control + C to stop.")
+        acquisition.start()
+        worker.start()
+        quality = monitor.start(ring)
+
+        # Labelled calibration prompts, scheduled in samples so replay speed doesn't matter
+        next_calibration = calibrate_every * sfreq if adaptive and calibrate_every else None
+        calibration_labels = list(LABELS)
+
+        try:
+            while True:
+                # Only the newest result matters, anything older was already superseded
+                result = results.get(timeout=view.until_next_frame() if view is not None else 0.1)
+                for thread in (acquisition, worker, quality):
+                    if thread.error is not None:
+                        raise thread.error
+                if metrics.report_due(report_every):
+                    metrics.counters.update(runtime_stats(ring, acquisition, worker, results), **predictor.stats(),
+                                            **monitor.quality.stats(), **conn.stats())
+                    for publisher in publishers:
+                        metrics.counters.update(publisher.stats())
+                    print(metrics.summary())
+                    log.event("metrics", **metrics.snapshot())
+                    if metrics_path:
+                        metrics.export(metrics_path)
+                if next_calibration is not None and ring.written >= next_calibration:
+                    label = calibration_labels[0]
+                    calibration_labels.reverse()
+                    predictor.calibrate(LABELS[label], ring)
+                    speak(CALIBRATION_PROMPTS[label])
+                    next_calibration += calibrate_every * sfreq
+                if result is not None:
+                    pred, confidence, alpha_powers, sample_time = result
+                    with metrics.time("speak"):
+                        announce("Eyes open" if pred == 0 else "Eyes closed")
+                    if view is None:
+                        metrics.observe("sample_to_display", time.time() - sample_time)
+                    else:
+                        view.set_decision(pred, confidence, alpha_powers, sample_time)
+
+                # Frames come at a fixed rate whatever the inference rate, drawing only what changed
+                if view is not None and view.frame_due():
+                    with metrics.time("draw"):
+                        shown = view.render(ring)
+                    if shown is not None:
+                        metrics.observe("sample_to_display", time.time() - shown)
+
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.stop()
+            quality.stop()
+            acquisition.stop()
+            worker.join()
+            quality.join()
+            acquisition.join()
+            for publisher in publishers:
+                metrics.counters.update(publisher.stats())
+                publisher.stop()
+            if view is not None:
+                view.close()
+            metrics.counters.update(runtime_stats(ring, acquisition, worker, results), **predictor.stats(),
+                                    **monitor.quality.stats(), **conn.stats())
+            print(metrics.summary())
+            log.event("end", **metrics.snapshot())
+            log.close()
+            if metrics_path:
+                metrics.export(metrics_path)
+            if log_path:
+                print(f"Session log written to {log_path} ({log.written} records)")
+            speak("Session ended.", wait=True)
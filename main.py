@@ -1,17 +1,80 @@
-# main.py
-from impedance_check import check_impedance
-from train_model import train_new_model
-from live_predict import run_live_prediction
-from utils import speak, choose_model
+import argparse
+import importlib
+import threading
+from board_source import open_board, source_board_id, BoardConnection, SOURCES, SERIAL_PORT
+from decision import METHODS
+from publisher import UdpPublisher, LslPublisher, FORMATS
+from utils import choose_model
+
+# Stages import their heavy dependencies (scipy, scikit-learn, matplotlib) only once
+# they run, so the model prompt comes up without waiting for them
 
 def main():
-    model_path = choose_model()  # Let user select existing or train new
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board', choices=SOURCES, default='cyton',
+                        help='cyton headset, BrainFlow synthetic board, or replay of recorded CSVs')
+    parser.add_argument('--serial-port', type=str, default=SERIAL_PORT, help='serial port of the cyton dongle')
+    parser.add_argument('--file', type=str, default=None,
+                        help='recording (or folder of recordings) for playback/replay, defaults to models/training_data')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed multiplier, e.g. 50 for 50x wall clock')
+    parser.add_argument('--subject', type=str, default=None, help='subject id stored with recorded sessions')
+    parser.add_argument('--metrics', type=str, default=None,
+                        help='export live loop latency metrics to this .jsonl (appended) or Prometheus text file')
+    parser.add_argument('--report-every', type=float, default=10.0, help='seconds between printed latency summaries')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='keep adapting the classifier to drift during live prediction')
+    parser.add_argument('--calibrate-every', type=float, default=None,
+                        help='with --adaptive, prompt a labelled eyes open/closed calibration every N seconds')
+    parser.add_argument('--search', action='store_true',
+                        help='when training, search bands, epoch lengths and classifiers instead of one LDA')
+    parser.add_argument('--udp-port', type=int, default=None,
+                        help='publish every decision to local UDP subscribers on this port (see stream_client.py)')
+    parser.add_argument('--udp-format', choices=FORMATS, default='json')
+    parser.add_argument('--lsl', action='store_true', help='publish decisions as an LSL outlet (needs pylsl)')
+    parser.add_argument('--no-ui', action='store_true', help='no matplotlib window, e.g. when only publishing')
+    parser.add_argument('--log', type=str, default=None,
+                        help='write every decision and metrics snapshot to this .jsonl (see session_log.py)')
+    parser.add_argument('--dashboard', action='store_true',
+                        help='show live EEG traces, alpha power and prediction history instead of the circle')
+    parser.add_argument('--fps', type=float, default=30.0, help='UI frame rate, independent of the inference rate')
+    parser.add_argument('--update-hz', type=float, default=10.0, help='inference rate, decisions per second')
+    parser.add_argument('--smoothing', choices=METHODS, default=None,
+                        help='decide on a smoothed posterior (exponential or HMM) instead of each window alone')
+    parser.add_argument('--hysteresis', type=float, default=0.75,
+                        help='with --smoothing, posterior needed to switch to the other eye state')
+    parser.add_argument('--min-dwell', type=float, default=0.5,
+                        help='with --smoothing, seconds a state holds before it may switch again')
+    parser.add_argument('--keep-artifacts', action='store_true',
+                        help='classify every window, even those flagged as blinks, muscle or motion')
+    args = parser.parse_args()
+    if args.calibrate_every is not None and not args.adaptive:
+        parser.error("--calibrate-every needs --adaptive, calibration only updates an adapting model")
+
+    # Let user select an existing model for this board's channel layout or train new
+    model_path = choose_model(args.subject, source_board_id(args.board, args.file))
+
+    # import the live stage while the serial handshake runs
+    threading.Thread(target=importlib.import_module, args=("live_predict",), daemon=True).start()
+    board = open_board(args.board, args.serial_port, args.file, args.speed)
 
-    check_impedance()  # Verify electrodes before continuing
-    if model_path is None:
-        model_path = train_new_model()
+    # one board session for the whole run, training and live prediction borrow it;
+    # electrodes are checked continuously by the signal quality monitor of both stages
+    with BoardConnection(board) as conn:
+        if model_path is None:
+            from train_model import train_new_model
+            model_path = train_new_model(conn, args.subject, search=args.search)
 
-    run_live_prediction(model_path)
+        publishers = []
+        if args.udp_port is not None:
+            publishers.append(UdpPublisher(port=args.udp_port, fmt=args.udp_format).start())
+        if args.lsl:
+            publishers.append(LslPublisher())
+        from live_predict import run_live_prediction
+        run_live_prediction(model_path, conn, update_hz=args.update_hz, metrics_path=args.metrics, report_every=args.report_every,
+                            adaptive=args.adaptive, calibrate_every=args.calibrate_every,
+                            publishers=publishers, ui=not args.no_ui, reject_artifacts=not args.keep_artifacts,
+                            log_path=args.log, dashboard=args.dashboard, fps=args.fps,
+                            smoothing=args.smoothing, hysteresis=args.hysteresis, min_dwell=args.min_dwell)
 
 if __name__ == "__main__":
     main()
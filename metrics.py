@@ -0,0 +1,124 @@
+import json
+import math
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (1 µs .. 100 s, ~12% bucket width).
+
+    Recording is a bisect and an increment, cheap enough for the hot path.
+    Percentiles report the upper edge of the bucket they fall in.
+    """
+
+    BUCKETS_PER_DECADE = 20
+
+    def __init__(self, low=1e-6, high=100.0):
+        n = int(round(math.log10(high / low) * self.BUCKETS_PER_DECADE))
+        self.edges = [low * 10 ** (i / self.BUCKETS_PER_DECADE) for i in range(n + 1)]
+        self.counts = [0] * (n + 2)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect_left(self.edges, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        if not self.count:
+            return float("nan")
+        target = q / 100.0 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(self.edges[min(i, len(self.edges) - 1)], self.max)
+        return self.max
+
+    def stats(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else float("nan"),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class Metrics:
+    """Per-stage latency histograms plus free-form counters for the live loop.
+
+    Each stage should be recorded from a single thread; different stages may
+    live on different threads. `last` holds each stage's latest duration.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.last = {}
+        self._last_report = time.perf_counter()
+
+    def observe(self, name, seconds):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms.setdefault(name, LatencyHistogram())
+        hist.record(seconds)
+        self.last[name] = seconds
+
+    @contextmanager
+    def time(self, name):
+        t0 = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter_ns() - t0) * 1e-9)
+
+    def snapshot(self):
+        return {
+            "time": time.time(),
+            "stages": {name: h.stats() for name, h in list(self.histograms.items())},
+            "counters": dict(self.counters),
+        }
+
+    def summary(self):
+        lines = [f"{'stage':<20}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for name, s in self.snapshot()["stages"].items():
+            lines.append(f"{name:<20}{s['count']:>8}{s['p50'] * 1e3:>10.3f}{s['p95'] * 1e3:>10.3f}"
+                         f"{s['p99'] * 1e3:>10.3f}{s['max'] * 1e3:>10.3f}")
+        if self.counters:
+            lines.append("  ".join(f"{k}={v:.3g}" if isinstance(v, float) else f"{k}={v}"
+                                   for k, v in self.counters.items()))
+        return "\n".join(lines)
+
+    def report_due(self, interval):
+        now = time.perf_counter()
+        if now - self._last_report < interval:
+            return False
+        self._last_report = now
+        return True
+
+    def export(self, path):
+        """Append a JSON snapshot to a .jsonl file, or rewrite a Prometheus text file otherwise."""
+        snap = self.snapshot()
+        if path.endswith(".jsonl"):
+            with open(path, "a") as f:
+                f.write(json.dumps(snap) + "\n")
+            return
+
+        lines = ["# TYPE eegbrain_stage_seconds summary"]
+        for name, s in snap["stages"].items():
+            for q in ("p50", "p95", "p99"):
+                lines.append(f'eegbrain_stage_seconds{{stage="{name}",quantile="0.{q[1:]}"}} {s[q]:.9f}')
+            lines.append(f'eegbrain_stage_seconds_sum{{stage="{name}"}} {s["mean"] * s["count"]:.9f}')
+            lines.append(f'eegbrain_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+        for name, value in snap["counters"].items():
+            lines.append(f"# TYPE eegbrain_{name} gauge")
+            lines.append(f"eegbrain_{name} {value}")
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
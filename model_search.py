@@ -0,0 +1,210 @@
+import os
+import pickle
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sklearn.model_selection import GroupKFold, cross_val_score
+from brainflow.board_shim import BoardIds
+from artifacts import ArtifactDetector
+from compiled_model import export_model, compiled_path
+from dataset import DatasetCatalog
+from features import FILTER_BANK, HOP_SEC, epoch_samples, epoch_view, feature_params, feature_signature
+from pipelines import CLASSIFIERS, make_classifier
+from registry import MODEL_DIR, default_registry
+from streaming_filter import StreamingBandpass
+from utils import get_timestamp
+
+SAVE_DIR = "models/training_data"
+
+# Search grid: band sets (one feature block per band), epoch lengths and classifiers
+BAND_SETS = (
+    (("alpha", 8.0, 12.0),),
+    (("alpha_low", 8.0, 10.0), ("alpha_high", 10.0, 13.0)),
+    (("theta", 4.0, 8.0), ("alpha", 8.0, 12.0), ("beta", 12.0, 30.0)),
+    (("alpha_beta", 8.0, 30.0),),
+)
+WINDOWS = (0.5, 1.0, 2.0)
+
+
+def filter_once(recordings, sfreq, bands, out_dir):
+    """Band-pass every recording once per distinct band, into one memory-mappable .npy per band.
+
+    Uses the same causal filter as live prediction. Recordings are laid end
+    to end; returns {(low, high): path} and the recording offsets.
+    """
+    offsets = np.cumsum([0] + [r.shape[1] for r in recordings])
+    n_channels = recordings[0].shape[0]
+    paths = {}
+    for low, high in bands:
+        path = os.path.join(out_dir, f"band_{low:g}_{high:g}.npy")
+        out = np.lib.format.open_memmap(path, mode="w+", shape=(n_channels, int(offsets[-1])))
+        for r, start, stop in zip(recordings, offsets[:-1], offsets[1:]):
+            out[:, start:stop] = StreamingBandpass(n_channels, sfreq, low, high).process(np.asarray(r, dtype=np.float64))
+        out.flush()
+        paths[(low, high)] = path
+    return paths, offsets
+
+
+def artifact_masks(recordings, accel, sfreq, window_sec, detector):
+    """Per recording, which of its window_sec epochs are clean; fits `detector` first if needed."""
+    size, _ = epoch_samples(sfreq, window_sec, HOP_SEC)
+    measures = []
+    for r, a in zip(recordings, accel):
+        if r.shape[1] < size:
+            measures.append(None)
+            continue
+        accel_epochs = None if a is None else epoch_view(np.asarray(a), sfreq, window_sec, HOP_SEC)
+        measures.append(detector.measure(epoch_view(np.asarray(r), sfreq, window_sec, HOP_SEC), accel_epochs))
+    if not detector.fitted:
+        detector.fit_measures(np.concatenate([m for m in measures if m is not None]))
+    detector.clean_from(np.concatenate([m for m in measures if m is not None]))  # fail early if nothing is clean
+    return [None if m is None else ~detector.flags_from(m).any(axis=-1) for m in measures]
+
+
+def band_epochs(paths, offsets, bands, sfreq, window_sec, y, groups, keep=None):
+    """(epochs x bands x channels x samples) input, labels and groups from the filtered recordings.
+
+    `keep` optionally holds one boolean mask of clean epochs per recording.
+    """
+    signals = [np.load(paths[(low, high)], mmap_mode="r") for _, low, high in bands]
+    size, _ = epoch_samples(sfreq, window_sec, HOP_SEC)
+    X, epoch_y, epoch_groups = [], [], []
+    for i, (start, stop) in enumerate(zip(offsets[:-1], offsets[1:])):
+        if stop - start < size:
+            continue
+        block = np.stack([s[:, start:stop] for s in signals])  # (bands, channels, samples)
+        epochs = np.swapaxes(epoch_view(block, sfreq, window_sec, HOP_SEC), 0, 1)
+        if keep is not None:
+            epochs = epochs[keep[i]]
+        X.append(epochs)
+        epoch_y.append(np.full(len(epochs), y[i]))
+        epoch_groups.append(np.full(len(epochs), groups[i]))
+    if not X:
+        raise ValueError(f"No recording is long enough for {window_sec} s epochs")
+    return np.concatenate(X), np.concatenate(epoch_y), np.concatenate(epoch_groups)
+
+
+def _evaluate(job):
+    """Grouped CV accuracy of each classifier on one band set and window length, without the held-out rounds."""
+    paths, offsets, bands, window_sec, y, groups, sfreq, classifiers, keep, held_out = job
+    try:
+        X, epoch_y, epoch_groups = band_epochs(paths, offsets, bands, sfreq, window_sec, y, groups, keep)
+    except ValueError:
+        return []
+    search = ~np.isin(epoch_groups, held_out)
+    X, epoch_y, epoch_groups = X[search], epoch_y[search], epoch_groups[search]
+    n_groups = len(np.unique(epoch_groups))
+    if n_groups < 2:
+        return []  # short recordings left too few rounds at this window length
+    # hold out whole recording rounds, overlapping epochs of one round would leak
+    cv = GroupKFold(min(5, n_groups))
+    results = []
+    for name in classifiers:
+        scores = cross_val_score(make_classifier(name), X, epoch_y, groups=epoch_groups, cv=cv)
+        results.append({"bands": bands, "window_sec": window_sec, "classifier": name,
+                        "cv_accuracy": float(np.mean(scores))})
+    return results
+
+
+def train_best(recordings, y, groups, sfreq, eeg_channels, accel=None, detector=None, band_sets=BAND_SETS,
+               windows=WINDOWS, classifiers=CLASSIFIERS, workers=None, **meta):
+    """Cross-validate every band set x window x classifier in parallel and save the best pipeline.
+
+    `recordings` are (channels x samples) EEG arrays, `y` and `groups` one
+    label and recording round per recording. With an ArtifactDetector, each
+    window length gets its own copy, fitted on these recordings unless
+    already fitted, and flagged epochs are left out. Returns the saved
+    model path.
+
+    The best CV score is biased upwards by the selection itself, so it is
+    registered as `search_score`. With three or more rounds, the newest
+    fifth (at least one) is kept out of the search and the winner's accuracy
+    on them is registered as `cv_accuracy`, comparable with other models.
+    """
+    y, groups = np.asarray(y), np.asarray(groups)
+    rounds = np.unique(groups)
+    if len(rounds) < 2:
+        raise ValueError("Need at least two recording rounds to cross-validate")
+    # groups number rounds in recording order
+    held_out = rounds[-max(1, len(rounds) // 5):] if len(rounds) >= 3 else rounds[:0]
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix="eegbrain_search_")
+    try:
+        # the expensive filtering happens once per band, every fold and classifier reads it back
+        distinct = sorted({(low, high) for bands in band_sets for _, low, high in bands})
+        paths, offsets = filter_once(recordings, sfreq, distinct, tmp)
+
+        detectors, masks = {}, {}
+        if detector is not None:
+            for w in windows:
+                detectors[w] = ArtifactDetector.from_state(detector.state())
+                masks[w] = artifact_masks(recordings, accel or [None] * len(recordings), sfreq, w, detectors[w])
+
+        jobs = [(paths, offsets, bands, w, y, groups, sfreq, classifiers, masks.get(w), held_out)
+                for bands in band_sets for w in windows]
+        print(f"Evaluating {len(jobs) * len(classifiers)} pipelines with {workers or os.cpu_count()} worker(s)...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [r for batch in pool.map(_evaluate, jobs) for r in batch]
+        if not results:
+            raise ValueError("Recordings are too short for every window length")
+        results.sort(key=lambda r: r["cv_accuracy"], reverse=True)
+
+        for r in results[:10]:
+            bands = "+".join(name for name, _, _ in r["bands"])
+            print(f"  {r['cv_accuracy']:.3f}  {r['classifier']:<14}{bands:<24}{r['window_sec']:g} s")
+
+        best = results[0]
+        X, epoch_y, epoch_groups = band_epochs(paths, offsets, best["bands"], sfreq, best["window_sec"], y, groups,
+                                               masks.get(best["window_sec"]))
+        test = np.isin(epoch_groups, held_out)
+        accuracy = None
+        if test.any():
+            accuracy = float(make_classifier(best["classifier"]).fit(X[~test], epoch_y[~test])
+                             .score(X[test], epoch_y[test]))
+            print(f"Held-out accuracy on {len(held_out)} unseen round(s): {accuracy:.3f}")
+        clf = make_classifier(best["classifier"]).fit(X, epoch_y)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    model_name = f"{MODEL_DIR}/{best['classifier']}_{get_timestamp()}.pkl"
+    with open(model_name, "wb") as f:
+        pickle.dump(clf, f)
+    compiled = export_model(clf, compiled_path(model_name))
+    params = dict(bands=best["bands"], epoch_sec=best["window_sec"], hop_sec=HOP_SEC, method=FILTER_BANK)
+    default_registry().register(
+        model_name, compiled=os.path.basename(compiled), classifier=best["classifier"], sfreq=sfreq, eeg_channels=list(eeg_channels),
+        features=feature_params(sfreq, **params), signature=feature_signature(sfreq, eeg_channels, **params),
+        scores={"cv_accuracy": accuracy, "search_score": best["cv_accuracy"]}, n_epochs=len(epoch_y), candidates=len(results),
+        artifacts=detectors[best["window_sec"]].state() if detectors else None, **meta)
+    return model_name
+
+
+def search_dataset(subject=None, board_id=BoardIds.CYTON_BOARD.value, since=None, workers=None):
+    """Run the search on every indexed eyes-open/eyes-closed recording, no headset needed."""
+    catalog = DatasetCatalog(SAVE_DIR)
+    catalog.update()
+    records = catalog.select(label=("open", "closed"), subject=subject, board_id=board_id, since=since)
+    if not records:
+        raise ValueError("No matching recordings in the dataset")
+    recordings, accel, y, groups = catalog.recordings(records)
+    model_name = train_best(recordings, y, groups, records[0]["sfreq"], records[0]["eeg_channels"], accel=accel,
+                            detector=ArtifactDetector.for_board(board_id), workers=workers,
+                            subject=subject, board_id=board_id)
+    print(f"✅ Best pipeline saved as {model_name}")
+    return model_name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search bands, epoch lengths and classifiers with grouped CV.")
+    parser.add_argument('--subject', type=str, default=None)
+    parser.add_argument('--board-id', type=int, default=BoardIds.CYTON_BOARD.value)
+    parser.add_argument('--since', type=str, default=None, help='only recordings from YYYYmmdd_HHMMSS on')
+    parser.add_argument('--workers', type=int, default=None, help='process pool size, defaults to CPU count')
+    args = parser.parse_args()
+    search_dataset(args.subject, args.board_id, args.since, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import numpy as np
+from scipy.linalg import eigh
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Classifiers over band-passed (epochs x bands x channels x samples) input
+
+
+class LogVariance(BaseEstimator, TransformerMixin):
+    """Log band power of every band and channel."""
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return np.log10(np.var(X, axis=-1) + 1e-12).reshape(len(X), -1)
+
+
+class CSP(BaseEstimator, TransformerMixin):
+    """Common spatial patterns per band, then log variance of the projected signals.
+
+    The spatial filters solve the generalized eigenproblem of the two class
+    covariances; the extreme eigenvectors maximise the variance of one class
+    relative to the other.
+    """
+
+    def __init__(self, n_components=4, reg=1e-6):
+        self.n_components = n_components
+        self.reg = reg
+
+    def fit(self, X, y):
+        y = np.asarray(y)
+        self.classes_ = np.unique(y)
+        if len(self.classes_) != 2:
+            raise ValueError("CSP needs exactly two classes")
+        X = X - X.mean(axis=-1, keepdims=True)
+        covs = np.einsum("nbcs,nbds->nbcd", X, X)
+        covs /= np.trace(covs, axis1=-2, axis2=-1)[..., None, None]
+        n_channels = X.shape[2]
+        k = min(self.n_components, n_channels)
+        filters = []
+        for b in range(X.shape[1]):
+            c0, c1 = (covs[y == c, b].mean(axis=0) for c in self.classes_)
+            composite = c0 + c1 + self.reg * np.trace(c0 + c1) * np.eye(n_channels)
+            _, vecs = eigh(c1, composite)  # ascending eigenvalues
+            picks = np.r_[np.arange(k // 2), np.arange(n_channels - (k - k // 2), n_channels)]
+            filters.append(vecs[:, picks].T)
+        self.filters_ = np.stack(filters)  # (bands, components, channels)
+        return self
+
+    def transform(self, X):
+        projected = np.einsum("bkc,nbcs->nbks", self.filters_, X)
+        return np.log10(np.var(projected, axis=-1) + 1e-12).reshape(len(X), -1)
+
+
+def make_classifier(name):
+    if name == "shrinkage_lda":
+        return make_pipeline(LogVariance(), LDA(solver="lsqr", shrinkage="auto"))
+    if name == "logreg":
+        return make_pipeline(LogVariance(), StandardScaler(), LogisticRegression(max_iter=1000))
+    if name == "csp_lda":
+        return make_pipeline(CSP(), LDA())
+    raise ValueError(f"Unknown classifier {name!r}, choose from {', '.join(CLASSIFIERS)}")
+
+
+CLASSIFIERS = ("shrinkage_lda", "logreg", "csp_lda")
@@ -0,0 +1,201 @@
+import os
+import re
+import json
+import warnings
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.signal import butter, sosfiltfilt
+from cache import ContentCache, CACHE_DIR, MAX_BYTES
+
+OPENBCI_BASE_DIR = os.path.expanduser("~/Documents/OpenBCI_GUI/Recordings")
+OUTPUT_DIR = "models/preprocessed"
+# Hz, used when the file header doesn't say. The old ReformatCSV assumed 255, a typo for the
+# Cyton's 250 Hz; pass --fs 255 to reproduce its output for headerless files.
+DEFAULT_SAMPLE_RATE = 250.0
+
+EEG_KEYS = ("exg", "eeg", "chan", "channel", "ch", "raw", "electrode")
+
+
+def header_sample_rate(filepath, default=DEFAULT_SAMPLE_RATE):
+    """Sample rate from an OpenBCI GUI '%Sample Rate = 250 Hz' header line, if any."""
+    with open(filepath, "r", errors="ignore") as f:
+        for line in f:
+            if not line.startswith("%"):
+                break
+            match = re.search(r"sample rate\s*=\s*([\d.]+)", line, re.IGNORECASE)
+            if match:
+                return float(match.group(1))
+    return default
+
+
+def read_openbci_csv(filepath, nrows=None):
+    # C parser: '%' metadata lines are comments, OpenBCI pads separators with spaces
+    return pd.read_csv(filepath, comment="%", skipinitialspace=True, engine="c", low_memory=False, nrows=nrows)
+
+
+def guess_eeg_columns(df):
+    candidates = [c for c in df.columns if any(k in str(c).lower() for k in EEG_KEYS)]
+    if not candidates:
+        numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+        candidates = numeric_cols[1:9] if len(numeric_cols) > 1 else numeric_cols
+    candidates = [c for c in candidates if "accel" not in str(c).lower() and "gyro" not in str(c).lower()]
+    if not candidates:
+        candidates = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    return list(dict.fromkeys(candidates))
+
+
+def clean_signals(x, lowcut, highcut, fs, order=4):
+    """Band-pass and z-score all (samples x channels) columns at once.
+
+    Columns with fewer than 10 finite samples are left as they are, gaps in
+    the others are forward/backward filled before filtering.
+    """
+    valid = np.isfinite(x).sum(axis=0) >= 10
+    if valid.any():
+        filled = pd.DataFrame(x[:, valid]).ffill().bfill().to_numpy()
+        sos = butter(order, [lowcut, highcut], btype="band", fs=fs, output="sos")
+        x[:, valid] = sosfiltfilt(sos, filled, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns stay NaN
+        x -= np.nanmean(x, axis=0)
+        x /= np.nanstd(x, axis=0, ddof=1)
+    return x
+
+
+def _read_sidecar(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def clean_file(filepath, out_dir=OUTPUT_DIR, lowcut=1.0, highcut=50.0, fs=None, order=4, cache=None):
+    """Clean one recording and write it as cleaned_<name>.npy (channels x samples) plus a .json sidecar.
+
+    With a ContentCache, files whose content and filter parameters match the
+    existing output are skipped, and cached results are reused instead of
+    being refiltered. Returns the output path, or None if the file couldn't be used.
+    """
+    fs = fs or header_sample_rate(filepath)
+    base = os.path.splitext(os.path.basename(filepath))[0]
+    outpath = os.path.join(out_dir, f"cleaned_{base}.npy")
+    sidecar = os.path.join(out_dir, f"cleaned_{base}.json")
+    params = {"lowcut": lowcut, "highcut": highcut, "fs": fs, "order": order}
+
+    key = cache.key(filepath, stage="clean", **params) if cache is not None else None
+    previous = _read_sidecar(sidecar) if key is not None else {}
+    if key is not None and previous.get("key") == key and os.path.exists(outpath):
+        return outpath  # unchanged since the last run
+
+    cached = cache.get(key) if key is not None else None
+    if cached is not None:
+        x = cached
+        eeg_cols = previous.get("columns") if previous.get("key") == key else None
+        if eeg_cols is None:
+            # no sidecar for this content: pick the columns again from the first rows
+            eeg_cols = [str(c) for c in guess_eeg_columns(read_openbci_csv(filepath, nrows=100))]
+    else:
+        try:
+            df = read_openbci_csv(filepath)
+        except Exception as e:
+            print(f"  ✖ Failed to read {filepath}: {e}")
+            return None
+
+        eeg_cols = guess_eeg_columns(df)
+        if df.empty or not eeg_cols:
+            print(f"  ✖ No EEG data in {filepath} — skipping file.")
+            return None
+
+        x = df[eeg_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64, copy=True)
+        x = np.ascontiguousarray(clean_signals(x, lowcut, highcut, fs, order).T)
+        eeg_cols = [str(c) for c in eeg_cols]
+        if key is not None:
+            cache.put(key, x)
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(outpath, x)
+    with open(sidecar, "w") as f:
+        json.dump(dict(params, source=os.path.abspath(filepath), columns=eeg_cols, key=key), f, indent=1)
+    return outpath
+
+
+def find_session_files(base_dir):
+    """Every .csv/.txt recording inside OpenBCISession_* folders of base_dir."""
+    files = []
+    for d in sorted(os.listdir(base_dir)):
+        sdir = os.path.join(base_dir, d)
+        if d.startswith("OpenBCISession_") and os.path.isdir(sdir):
+            files += [os.path.join(sdir, f) for f in sorted(os.listdir(sdir))
+                      if f.lower().endswith((".csv", ".txt"))]
+    return files
+
+
+_worker_cache = None
+
+
+def _init_worker(cache_args):
+    # one cache per worker process, so its running size is scanned once per batch, not per file
+    global _worker_cache
+    _worker_cache = ContentCache(*cache_args) if cache_args else None
+
+
+def _clean_one(job):
+    filepath, kwargs = job
+    try:
+        return filepath, clean_file(filepath, cache=_worker_cache, **kwargs)
+    except Exception as e:
+        # one bad file shouldn't take the whole batch down
+        print(f"  ✖ {filepath}: {e}")
+        return filepath, None
+
+
+def process_all(base_dir=OPENBCI_BASE_DIR, out_dir=OUTPUT_DIR, workers=None,
+                cache_dir=CACHE_DIR, cache_bytes=MAX_BYTES, **kwargs):
+    """Clean every session file under base_dir across a process pool.
+
+    Pass cache_dir=None to always reprocess everything.
+    """
+    if not os.path.exists(base_dir):
+        print(f"Error: Base directory not found: {base_dir}")
+        return []
+
+    files = find_session_files(base_dir)
+    if not files:
+        print(f"No .csv or .txt files found in OpenBCISession_* folders of {base_dir}")
+        return []
+
+    print(f"Processing {len(files)} data file(s) with {workers or os.cpu_count()} worker(s)...")
+    kwargs["out_dir"] = out_dir
+    cache_args = (cache_dir, cache_bytes) if cache_dir else None
+    outputs = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_args,)) as pool:
+        jobs = [(f, kwargs) for f in files]
+        for filepath, outpath in pool.map(_clean_one, jobs, chunksize=4):
+            if outpath:
+                print(f"  ✅ {os.path.basename(filepath)} → {outpath}")
+                outputs.append(outpath)
+    print(f"\nCleaned {len(outputs)}/{len(files)} file(s) into {out_dir}")
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch band-pass and normalize OpenBCI session recordings.")
+    parser.add_argument('--input', type=str, default=OPENBCI_BASE_DIR, help='folder containing OpenBCISession_* folders')
+    parser.add_argument('--output', type=str, default=OUTPUT_DIR, help='where cleaned .npy files are written')
+    parser.add_argument('--lowcut', type=float, default=1.0)
+    parser.add_argument('--highcut', type=float, default=50.0)
+    parser.add_argument('--fs', type=float, default=None, help=f'sample rate, read from the file header or {DEFAULT_SAMPLE_RATE:g} Hz by default')
+    parser.add_argument('--order', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=None, help='process pool size, defaults to CPU count')
+    parser.add_argument('--cache-dir', type=str, default=CACHE_DIR, help="content-addressed cache, '' to disable")
+    parser.add_argument('--cache-mb', type=int, default=MAX_BYTES // 1024 ** 2, help='cache size cap in MB')
+    args = parser.parse_args()
+    process_all(args.input, args.output, args.workers, args.cache_dir, args.cache_mb * 1024 ** 2,
+                lowcut=args.lowcut, highcut=args.highcut, fs=args.fs, order=args.order)
+
+
+if __name__ == "__main__":
+    main()
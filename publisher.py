@@ -0,0 +1,193 @@
+import json
+import time
+import struct
+import asyncio
+import threading
+from collections import deque
+
+HOST = "127.0.0.1"
+PORT = 9876
+SUBSCRIBE, UNSUBSCRIBE = b"subscribe", b"unsubscribe"
+CLIENT_TIMEOUT = 10.0  # clients must re-send SUBSCRIBE at least this often
+FORMATS = ("json", "binary")
+
+# binary layout: version byte (never "{", so JSON is told apart by its first byte), seq,
+# prediction, confidence, sample time, sent time, board name length, then the name
+# (utf-8), the channel count and one float32 band power per channel
+BINARY_VERSION = 1
+_HEAD = struct.Struct("<BIBfddB")
+_COUNT = struct.Struct("<H")
+
+
+def decision_message(board, prediction, confidence, alpha_power, sample_time):
+    return {"board": board, "prediction": int(prediction), "confidence": float(confidence),
+            "alpha_power": [float(p) for p in alpha_power], "sample_time": float(sample_time)}
+
+
+def encode(msg, fmt="json"):
+    if fmt == "json":
+        return json.dumps(msg, separators=(",", ":")).encode()
+    name = msg["board"].encode()
+    powers = msg["alpha_power"]
+    return (_HEAD.pack(BINARY_VERSION, msg["seq"], msg["prediction"], msg["confidence"], msg["sample_time"], msg["sent"], len(name))
+            + name + _COUNT.pack(len(powers)) + struct.pack(f"<{len(powers)}f", *powers))
+
+
+def decode(payload):
+    """Inverse of encode() for either format."""
+    if payload[:1] == b"{":
+        return json.loads(payload)
+    version, seq, prediction, confidence, sample_time, sent, n_name = _HEAD.unpack_from(payload)
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported message version {version}")
+    offset = _HEAD.size
+    board = payload[offset:offset + n_name].decode()
+    offset += n_name
+    (n,) = _COUNT.unpack_from(payload, offset)
+    powers = struct.unpack_from(f"<{n}f", payload, offset + _COUNT.size)
+    return {"seq": seq, "board": board, "prediction": prediction, "confidence": confidence,
+            "alpha_power": list(powers), "sample_time": sample_time, "sent": sent}
+
+
+class _Client:
+    def __init__(self, addr, queue_size):
+        self.addr = addr
+        self.queue = deque(maxlen=queue_size)
+        self.wakeup = asyncio.Event()
+        self.last_seen = time.monotonic()
+        self.dropped = 0
+
+
+class UdpPublisher(asyncio.DatagramProtocol):
+    """Streams decisions to local UDP subscribers from a background asyncio loop.
+
+    A client subscribes by sending SUBSCRIBE to the publisher port, and keeps
+    its subscription alive by re-sending it within CLIENT_TIMEOUT. Each
+    client has its own bounded send queue drained by its own task; a client
+    that falls behind loses its oldest messages, so publish() never blocks
+    the inference thread.
+    """
+
+    def __init__(self, host=HOST, port=PORT, fmt="json", queue_size=32):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown message format '{fmt}', expected one of {FORMATS}")
+        self.host = host
+        self.port = port
+        self.fmt = fmt
+        self.queue_size = queue_size
+        self.clients = {}
+        self.published = 0
+        self.transport = None
+        self.loop = None
+        self._writable = None
+        self._thread = None
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self._writable = asyncio.Event()
+            self._writable.set()
+            self.transport, _ = self.loop.run_until_complete(
+                self.loop.create_datagram_endpoint(lambda: self, local_addr=(self.host, self.port)))
+            self.port = self.transport.get_extra_info("sockname")[1]  # resolves port 0
+            ready.set()
+            self.loop.run_forever()
+            self.transport.close()
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+        self._thread = threading.Thread(target=run, name="publisher", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+
+    def publish(self, msg):
+        """Queue a message for every subscriber; safe to call from any thread."""
+        self.published += 1
+        msg = dict(msg, seq=self.published, sent=time.time())
+        self.loop.call_soon_threadsafe(self._fanout, encode(msg, self.fmt))
+
+    def stats(self):
+        return {"subscribers": len(self.clients), "published": self.published,
+                "client_drops": sum(c.dropped for c in list(self.clients.values()))}
+
+    # asyncio side, runs on the publisher thread
+
+    def datagram_received(self, data, addr):
+        if data == SUBSCRIBE:
+            client = self.clients.get(addr)
+            if client is None:
+                client = self.clients[addr] = _Client(addr, self.queue_size)
+                self.loop.create_task(self._sender(client))
+            client.last_seen = time.monotonic()
+        elif data == UNSUBSCRIBE and addr in self.clients:
+            self.clients.pop(addr).wakeup.set()
+
+    def pause_writing(self):
+        self._writable.clear()
+
+    def resume_writing(self):
+        self._writable.set()
+
+    def _fanout(self, payload):
+        now = time.monotonic()
+        for addr, client in list(self.clients.items()):
+            if now - client.last_seen > CLIENT_TIMEOUT:
+                self.clients.pop(addr).wakeup.set()
+                continue
+            if len(client.queue) == client.queue.maxlen:
+                client.dropped += 1  # deque drops the oldest
+            client.queue.append(payload)
+            client.wakeup.set()
+
+    async def _sender(self, client):
+        while self.clients.get(client.addr) is client:
+            await client.wakeup.wait()
+            client.wakeup.clear()
+            while client.queue:
+                await self._writable.wait()
+                self.transport.sendto(client.queue.popleft(), client.addr)
+
+
+class LslPublisher:
+    """Lab Streaming Layer outlets, one per board: prediction, confidence and band powers per sample.
+
+    Needs the optional pylsl package; without it publishing is a no-op.
+    """
+
+    def __init__(self, name="EEGBrain"):
+        self.name = name
+        self.outlets = {}
+        try:
+            import pylsl
+        except Exception as e:
+            print(f"⚠️ LSL disabled: {e}")
+            pylsl = None
+        self._pylsl = pylsl
+
+    def publish(self, msg):
+        if self._pylsl is None:
+            return
+        outlet = self.outlets.get(msg["board"])
+        if outlet is None:
+            info = self._pylsl.StreamInfo(f"{self.name} {msg['board']}", "EyeState", 2 + len(msg["alpha_power"]),
+                                          self._pylsl.IRREGULAR_RATE, "float32", f"{self.name}-{msg['board']}")
+            outlet = self.outlets[msg["board"]] = self._pylsl.StreamOutlet(info)
+        outlet.push_sample([msg["prediction"], msg["confidence"], *msg["alpha_power"]])
+
+    def stats(self):
+        return {}
+
+    def stop(self):
+        self.outlets.clear()
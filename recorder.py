@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import queue
+import threading
+import numpy as np
+from brainflow.board_shim import BoardShim
+from utils import get_timestamp
+
+META_FILE = "meta.json"
+
+
+def write_meta(session_dir, meta):
+    # write-then-rename so a reader never sees a half written index
+    tmp = os.path.join(session_dir, META_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, os.path.join(session_dir, META_FILE))
+
+
+def new_session_dir(root_dir):
+    """Create a fresh session_<timestamp> folder, suffixed if that second is already taken."""
+    os.makedirs(root_dir, exist_ok=True)
+    base = os.path.join(root_dir, f"session_{get_timestamp()}")
+    path, n = base, 1
+    while True:
+        try:
+            os.mkdir(path)
+            return path
+        except FileExistsError:
+            n += 1
+            path = f"{base}_{n}"
+
+
+class SessionRecorder:
+    """Appends raw board frames to a session folder of .npy segments.
+
+    Each append() becomes one segment file plus an entry (label, round,
+    sample count) in the session's meta.json, which also records the board
+    layout. Files are written on a background thread so recording loops
+    never wait on the disk.
+    """
+
+    def __init__(self, root_dir, board_id, dtype=np.float64, subject=None):
+        self.session_dir = new_session_dir(root_dir)
+        self.dtype = np.dtype(dtype)
+        self.meta = {
+            "created": get_timestamp(),
+            "subject": subject,
+            "board_id": board_id,
+            "board": BoardShim.get_board_descr(board_id),
+            "dtype": self.dtype.name,
+            "segments": [],
+        }
+        self.error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self._thread.start()
+        self._queue.put((None, None))  # write the (empty) meta.json right away
+
+    def append(self, data, label=None, **extra):
+        """Queue one (rows x samples) board frame; returns immediately."""
+        if self.error is not None:
+            raise self.error
+        self._queue.put((np.array(data, dtype=self.dtype, order="C"), dict(extra, label=label)))
+
+    def close(self):
+        """Flush pending segments and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.session_dir
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue
+            data, info = item
+            try:
+                if data is not None:
+                    name = f"seg_{len(self.meta['segments']):04d}.npy"
+                    np.save(os.path.join(self.session_dir, name), data)
+                    self.meta["segments"].append(dict(info, file=name, samples=data.shape[1]))
+                write_meta(self.session_dir, self.meta)
+            except Exception as e:
+                self.error = e
+
+
+def read_meta(session_dir):
+    with open(os.path.join(session_dir, META_FILE)) as f:
+        return json.load(f)
+
+
+def is_session(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def load_segment(session_dir, segment):
+    """Memory-map one segment (rows x samples) without reading it into RAM."""
+    return np.load(os.path.join(session_dir, segment["file"]), mmap_mode="r")
+
+
+def iter_segments(session_dir):
+    meta = read_meta(session_dir)
+    for segment in meta["segments"]:
+        yield segment, load_segment(session_dir, segment)
+
+
+def export_csv(session_dir, out_dir=None):
+    """Offline conversion of a session to the old one-CSV-per-recording layout."""
+    from utils import save_csv_with_header
+    out_dir = out_dir or session_dir
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for segment, data in iter_segments(session_dir):
+        prefix = segment.get("label") or "segment"
+        path = os.path.join(out_dir, f"{prefix}_{os.path.splitext(segment['file'])[0]}.csv")
+        save_csv_with_header(np.asarray(data), path)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    # python recorder.py <session_dir> [out_dir]
+    if len(sys.argv) < 2:
+        print("Usage: python recorder.py <session_dir> [out_dir]")
+        sys.exit(1)
+    for p in export_csv(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None):
+        print(f"Exported {p}")
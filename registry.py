@@ -0,0 +1,125 @@
+import os
+import json
+import pickle
+import time
+import threading
+from collections import OrderedDict
+
+MODEL_DIR = "models/trained_models"
+REGISTRY_FILE = "registry.jsonl"
+
+
+class ModelRegistry:
+    """Index of trained models: metadata, validation scores and feature signature.
+
+    The index is an append-only JSON-lines file next to the models; a later
+    line for the same file overrides earlier ones. An entry's `compiled`
+    field names its .npz export. Loaded models are kept in a small LRU so
+    switching between recently used models is instant.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, max_loaded=8):
+        self.model_dir = model_dir
+        self.index_path = os.path.join(model_dir, REGISTRY_FILE)
+        self.max_loaded = max_loaded
+        self.entries = {}
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["file"]] = entry
+
+    def register(self, path, **meta):
+        """Record metadata for a saved model file; returns the index entry."""
+        os.makedirs(self.model_dir, exist_ok=True)
+        created = meta.pop("created", None) or time.strftime("%Y%m%d_%H%M%S")
+        entry = dict(meta, file=os.path.basename(path), created=created)
+        with open(self.index_path, "a") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self.entries[entry["file"]] = entry
+        return entry
+
+    def sync(self):
+        """Forget entries whose model file is gone and register .pkl files that predate the registry.
+
+        Those have no signature and won't load live.
+        """
+        os.makedirs(self.model_dir, exist_ok=True)
+        files = set(os.listdir(self.model_dir))
+        for name in [n for n in self.entries if n not in files]:
+            del self.entries[name]
+        for name in sorted(files):
+            if name.endswith(".pkl") and name not in self.entries:
+                self.register(name, signature=None, legacy=True)
+
+    def select(self, subject=None, signature=None, board_id=None, sfreq=None, eeg_channels=None):
+        """Matching entries, newest first; `sfreq` and `eeg_channels` select a board's channel layout."""
+        entries = [
+            e for e in self.entries.values()
+            if (subject is None or e.get("subject") == subject)
+            and (signature is None or e.get("signature") == signature)
+            and (board_id is None or e.get("board_id") == board_id)
+            and (sfreq is None or e.get("sfreq") == sfreq)
+            and (eeg_channels is None or e.get("eeg_channels") == list(eeg_channels))
+        ]
+        return sorted(entries, key=lambda e: e["created"], reverse=True)
+
+    def best(self, subject=None, signature=None, metric="cv_accuracy", sfreq=None, eeg_channels=None):
+        """Highest scoring entry for a subject, feature pipeline and channel layout, or None."""
+        entries = self.select(subject, signature, sfreq=sfreq, eeg_channels=eeg_channels)
+        scored = [e for e in entries if e.get("scores", {}).get(metric) is not None]
+        return max(scored, key=lambda e: e["scores"][metric], default=None)
+
+    def path(self, name):
+        return os.path.join(self.model_dir, os.path.basename(name))
+
+    def load(self, name, signature=None, compiled=True):
+        """Return the model, rejecting it if it was trained on a different feature pipeline.
+
+        Models with a pickle-free export load as a CompiledModel, which needs
+        neither unpickling nor sklearn; compiled=False gets the pickle.
+        """
+        name = os.path.basename(name)
+        entry = self.entries.get(name, {})
+        if signature is not None:
+            expected = entry.get("signature")
+            if expected != signature:
+                raise ValueError(f"Model {name} expects feature signature {expected}, "
+                                 f"live pipeline produces {signature}. Retrain the model.")
+        if compiled and entry.get("compiled"):
+            name = entry["compiled"]
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name]
+        if name.endswith(".npz"):
+            from compiled_model import CompiledModel
+            model = CompiledModel.load(self.path(name))
+        else:
+            with open(self.path(name), "rb") as f:
+                model = pickle.load(f)
+        with self._lock:
+            self._loaded[name] = model
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return model
+
+    def preload(self, names):
+        """Load models on a background thread so a later load() is a dict lookup."""
+        thread = threading.Thread(target=lambda: [self.load(n) for n in names], name="preload", daemon=True)
+        thread.start()
+        return thread
+
+
+_default = None
+
+
+def default_registry():
+    """Process-wide registry, so models preloaded at startup are shared with live prediction."""
+    global _default
+    if _default is None:
+        _default = ModelRegistry()
+    return _default
@@ -0,0 +1,167 @@
+import threading
+import time
+import numpy as np
+
+
+class RingBuffer:
+    """Preallocated (rows x capacity) sample buffer for one writer and any readers.
+
+    Every sample is stored twice, `capacity` apart, so any run of up to
+    `capacity` recent samples is one contiguous slice and reads are zero-copy
+    views. The writer publishes by bumping `written` after the data is in
+    place, so readers never need a lock.
+    """
+
+    def __init__(self, n_rows, capacity):
+        self.capacity = capacity
+        self.written = 0    # total samples ever written
+        self.overruns = 0   # samples lost because a single write exceeded capacity
+        self._buf = np.zeros((n_rows, 2 * capacity))
+
+    def write(self, block):
+        n = block.shape[1]
+        if n > self.capacity:
+            self.overruns += n - self.capacity
+            self.written += n - self.capacity
+            block = block[:, -self.capacity:]
+            n = self.capacity
+        pos = self.written % self.capacity
+        first = min(n, self.capacity - pos)
+        for offset in (0, self.capacity):
+            self._buf[:, offset + pos:offset + pos + first] = block[:, :first]
+            self._buf[:, offset:offset + n - first] = block[:, first:]
+        self.written += n
+
+    def view(self, start, stop):
+        """Zero-copy view of samples [start, stop), which must still be buffered."""
+        if stop - start > self.capacity or start < self.written - self.capacity:
+            raise IndexError(f"samples {start}:{stop} are no longer buffered")
+        pos = start % self.capacity
+        return self._buf[:, pos:pos + stop - start]
+
+    def latest(self, n):
+        stop = self.written
+        return self.view(stop - n, stop)
+
+
+class LatestValue:
+    """Single-slot mailbox: the producer never blocks and the consumer only sees the newest item."""
+
+    def __init__(self):
+        self.overwritten = 0  # results replaced before anyone read them (dropped frames)
+        self._cond = threading.Condition()
+        self._value = None
+        self._version = 0
+        self._seen = 0
+
+    def put(self, value):
+        with self._cond:
+            if self._version != self._seen:
+                self.overwritten += 1
+            self._value = value
+            self._version += 1
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        """Return the newest unseen value, or None if nothing new arrived within `timeout`."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._version != self._seen, timeout):
+                return None
+            self._seen = self._version
+            return self._value
+
+
+class AcquisitionThread(threading.Thread):
+    """Drains board.get_board_data() into a RingBuffer, keeping only `rows`."""
+
+    def __init__(self, board, ring, rows, poll_interval=0.01, metrics=None, name="acquisition"):
+        super().__init__(name=name, daemon=True)
+        self.board = board
+        self.ring = ring
+        self.rows = rows
+        self.poll_interval = poll_interval
+        self.metrics = metrics
+        self.stage = "fetch" if name == "acquisition" else f"fetch/{name}"  # one histogram per thread
+        self.reads = 0
+        self.max_batch = 0  # largest backlog drained at once, grows when we fall behind
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                t0 = time.perf_counter()
+                data = self.board.get_board_data()
+                if self.metrics is not None:
+                    self.metrics.observe(self.stage, time.perf_counter() - t0)
+                if data.shape[1]:
+                    self.ring.write(data[self.rows])
+                    self.reads += 1
+                    self.max_batch = max(self.max_batch, data.shape[1])
+                self._stop_event.wait(self.poll_interval)
+        except Exception as e:
+            self.error = e
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class InferenceWorker(threading.Thread):
+    """Calls `step(ring)` at a fixed cadence and posts non-None results to `out`.
+
+    Ticks that can't start on time because the previous step overran are
+    skipped and counted in `dropped_ticks` rather than queued up.
+    """
+
+    def __init__(self, ring, step, rate_hz, out, name="inference"):
+        super().__init__(name=name, daemon=True)
+        self.ring = ring
+        self.step = step
+        self.period = 1.0 / rate_hz
+        self.out = out
+        self.ticks = 0
+        self.dropped_ticks = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        next_tick = time.perf_counter()
+        try:
+            while not self._stop_event.is_set():
+                t0 = time.perf_counter()
+                result = self.step(self.ring)
+                self.last_latency = time.perf_counter() - t0
+                self.max_latency = max(self.max_latency, self.last_latency)
+                self.ticks += 1
+                if result is not None:
+                    self.out.put(result)
+
+                next_tick += self.period
+                late = time.perf_counter() - next_tick
+                if late >= self.period:
+                    missed = int(late // self.period)
+                    self.dropped_ticks += missed
+                    next_tick += missed * self.period
+                self._stop_event.wait(max(0.0, next_tick - time.perf_counter()))
+        except Exception as e:
+            self.error = e
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def runtime_stats(ring, acquisition, worker, results):
+    """Backpressure and dropped-frame counters of a running pipeline."""
+    return {
+        "samples": ring.written,
+        "ring_overruns": ring.overruns,
+        "acquisition_reads": acquisition.reads,
+        "max_backlog": acquisition.max_batch,
+        "ticks": worker.ticks,
+        "dropped_ticks": worker.dropped_ticks,
+        "inference_ms": worker.last_latency * 1000,
+        "max_inference_ms": worker.max_latency * 1000,
+        "dropped_frames": results.overwritten,
+    }
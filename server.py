@@ -0,0 +1,254 @@
+import time
+import argparse
+import threading
+import numpy as np
+from brainflow.board_shim import BoardShim
+from board_source import open_board, BoardConnection, SOURCES, SERIAL_PORT
+from decision import DecisionFilter, METHODS
+from live_predict import LivePredictor, load_model, ring_rows
+from metrics import Metrics
+from publisher import decision_message, UdpPublisher, LslPublisher, FORMATS, PORT
+from registry import default_registry
+from runtime import RingBuffer, LatestValue, AcquisitionThread, InferenceWorker
+from session_log import SessionLog
+from signal_quality import SignalQuality, QualityMonitor
+
+
+class BoardSession:
+    """One board of a MultiBoardServer: its own ring buffer, acquisition thread and filters."""
+
+    def __init__(self, name, board, clf, params, detector, metrics, buffer_sec=10, smoother=None):
+        self.name = name
+        self.board = BoardConnection(board)  # reconnects on its own if the link drops
+        board_id = board.get_board_id()
+        sfreq = BoardShim.get_sampling_rate(board_id)
+        self.eeg_channels, accel_channels, rows = ring_rows(board_id)
+        self.ring = RingBuffer(len(rows), buffer_sec * sfreq)
+        self.acquisition = AcquisitionThread(self.board, self.ring, rows, metrics=metrics, name=name)
+        self.predictor = LivePredictor(clf, sfreq, len(self.eeg_channels), metrics, params,
+                                       detector=detector, n_accel=len(accel_channels), smoother=smoother)
+        self.monitor = QualityMonitor(
+            SignalQuality.for_board(board_id, len(self.eeg_channels), sfreq, names=self.eeg_channels),
+            slice(0, len(self.eeg_channels)), label=name, metrics=metrics)
+
+
+class MultiBoardServer:
+    """Acquisition and inference for several boards sharing one model.
+
+    Every board streams into its own ring buffer on its own thread. A single
+    inference thread filters each board's new samples, stacks the latest
+    epochs and makes one featurize and one predict call for all of them per
+    tick. Results go to a shared state that any thread can query with state(),
+    and to every started publisher, which is stopped with the server, and
+    to an optional SessionLog, which the caller closes and which also records
+    each board's state transitions. A second thread keeps per-board signal
+    quality scores, see quality().
+    With `smoothing` ("ema" or "hmm") every board gets its own DecisionFilter.
+    """
+
+    def __init__(self, model_path, boards, update_hz=10.0, buffer_sec=10, metrics=None, publishers=(), log=None,
+                 smoothing=None):
+        self.metrics = metrics or Metrics()
+        self.publishers = publishers
+        self.log = log
+        board_ids = {b.get_board_id() for b in boards.values()}
+        if len(board_ids) != 1:
+            raise ValueError("All boards must be of one type to share a model")
+        self.clf, params, detector = load_model(model_path, board_ids.pop())
+        # the detector is stateless once fitted, so every board can share it
+        self.sessions = [BoardSession(name, board, self.clf, params, detector, self.metrics, buffer_sec,
+                                      DecisionFilter(self.clf.classes_, smoothing) if smoothing else None)
+                         for name, board in boards.items()]
+        self.updates = LatestValue()  # newest state snapshot, for consumers that want to block on changes
+        speed = max(getattr(b, "speed", 1.0) for b in boards.values())
+        self.worker = InferenceWorker(None, self._tick, update_hz * speed, self.updates)
+        self.quality_updates = LatestValue()
+        self.quality_worker = InferenceWorker(None, self._quality_tick, 4.0, self.quality_updates, name="quality")
+        self._quality = {}
+        self._lock = threading.Lock()
+        self._state = {s.name: {"prediction": None, "confidence": None, "alpha_power": None,
+                                "sample_time": None, "updated": None, "samples": 0} for s in self.sessions}
+
+    def _tick(self, _ring):
+        ready = []
+        for session in self.sessions:
+            latest = session.predictor.window(session.ring)
+            if latest is not None:
+                ready.append((session, latest))
+        if not ready:
+            return None
+
+        # one batched call for every board that has a new epoch
+        epochs = np.stack([epoch for _, (epoch, _, _) in ready])
+        with self.metrics.time("features"):
+            features = self.sessions[0].predictor.featurize(epochs)
+        with self.metrics.time("predict"):
+            proba = self.clf.predict_proba(features)
+
+        now = time.time()
+        with self._lock:
+            for (session, (_, stop, sample_time)), p in zip(ready, proba):
+                decision = session.predictor.decide(p, stop)
+                if decision is None:
+                    continue
+                pred, confidence = decision
+                msg = decision_message(session.name, pred, confidence,
+                                       session.predictor.alpha_filter.power, sample_time)
+                self._state[session.name] = dict(msg, updated=now, samples=stop)
+                for publisher in self.publishers:
+                    publisher.publish(msg)
+                if self.log is not None:
+                    self.log.decision(session.name, pred, confidence, msg["alpha_power"], sample_time)
+                self.metrics.observe("sample_to_decision", now - sample_time)
+            return {name: dict(state) for name, state in self._state.items()}
+
+    def _quality_tick(self, _ring):
+        scores = {s.name: s.monitor.step(s.ring) for s in self.sessions}
+        with self._lock:
+            self._quality.update({name: q for name, q in scores.items() if q is not None})
+            return dict(self._quality)
+
+    def quality(self, name=None):
+        """Latest signal quality scores of one board, or of all of them keyed by name."""
+        with self._lock:
+            return self._quality.get(name) if name is not None else dict(self._quality)
+
+    def state(self, name=None):
+        """Copy of one board's latest result, or of all of them keyed by name."""
+        with self._lock:
+            if name is not None:
+                return dict(self._state[name])
+            return {n: dict(s) for n, s in self._state.items()}
+
+    def errors(self):
+        threads = [self.worker, self.quality_worker] + [s.acquisition for s in self.sessions]
+        return {t.name: t.error for t in threads if t.error is not None}
+
+    def stats(self):
+        """Backpressure counters per board plus the shared inference thread."""
+        stats = {"ticks": self.worker.ticks, "dropped_ticks": self.worker.dropped_ticks,
+                 "inference_ms": self.worker.last_latency * 1000,
+                 "max_inference_ms": self.worker.max_latency * 1000}
+        for s in self.sessions:
+            stats[f"{s.name}_samples"] = s.ring.written
+            stats[f"{s.name}_overruns"] = s.ring.overruns
+            stats[f"{s.name}_max_backlog"] = s.acquisition.max_batch
+            stats[f"{s.name}_artifacts"] = sum(s.predictor.rejected.values())
+            stats[f"{s.name}_bad_channels"] = len(s.monitor.quality.bad_channels())
+            stats[f"{s.name}_reconnects"] = s.board.reconnects
+            if s.predictor.smoother is not None:
+                stats[f"{s.name}_transitions"] = s.predictor.smoother.transitions
+        for publisher in self.publishers:
+            stats.update(publisher.stats())
+        return stats
+
+    def start(self):
+        try:
+            for s in self.sessions:
+                s.board.open()
+        except Exception:
+            for s in self.sessions:
+                s.board.close()
+            raise
+        for s in self.sessions:
+            s.acquisition.start()
+        self.worker.start()
+        self.quality_worker.start()
+        return self
+
+    def stop(self):
+        self.worker.stop()
+        self.quality_worker.stop()
+        for s in self.sessions:
+            s.acquisition.stop()
+        self.worker.join()
+        self.quality_worker.join()
+        for s in self.sessions:
+            s.acquisition.join()
+            s.board.close()
+        for publisher in self.publishers:
+            publisher.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def best_model(sfreq, eeg_channels):
+    """Highest scoring registered model for a channel layout, or None."""
+    registry = default_registry()
+    registry.sync()
+    scored = [e for e in registry.select()
+              if e.get("sfreq") == sfreq and e.get("eeg_channels") == list(eeg_channels)
+              and e.get("scores", {}).get("cv_accuracy") is not None]
+    best = max(scored, key=lambda e: e["scores"]["cv_accuracy"], default=None)
+    return best and registry.path(best["file"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run eye state detection on several boards at once.")
+    parser.add_argument('--board', choices=SOURCES, default='synthetic')
+    parser.add_argument('--count', type=int, default=8, help='number of boards (ignored for cyton)')
+    parser.add_argument('--serial-port', type=str, nargs='+', default=[SERIAL_PORT],
+                        help='one serial port per cyton headset')
+    parser.add_argument('--file', type=str, default=None, help='recording for playback/replay boards')
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--model', type=str, default=None,
+                        help='model to share across boards, defaults to the best one for the board layout')
+    parser.add_argument('--update-hz', type=float, default=10.0)
+    parser.add_argument('--duration', type=float, default=None, help='seconds to run, until Ctrl+C by default')
+    parser.add_argument('--report-every', type=float, default=5.0)
+    parser.add_argument('--udp-port', type=int, default=PORT, help='publish decisions on this local UDP port, 0 to disable')
+    parser.add_argument('--udp-format', choices=FORMATS, default='json')
+    parser.add_argument('--lsl', action='store_true', help='also publish an LSL outlet per board (needs pylsl)')
+    parser.add_argument('--log', type=str, default=None, help='write every decision of every board to this .jsonl')
+    parser.add_argument('--smoothing', choices=METHODS, default=None,
+                        help='decide on a smoothed posterior per board instead of each window alone')
+    args = parser.parse_args()
+
+    if args.board == "cyton":
+        boards = {f"cyton{i}": open_board("cyton", port) for i, port in enumerate(args.serial_port)}
+    else:
+        boards = {f"{args.board}{i}": open_board(args.board, file=args.file, speed=args.speed, instance=i)
+                  for i in range(args.count)}
+    board_id = next(iter(boards.values())).get_board_id()
+    model = args.model or best_model(BoardShim.get_sampling_rate(board_id), BoardShim.get_eeg_channels(board_id))
+    if model is None:
+        raise SystemExit("✖ No trained model for this board layout, train one with main.py --board " + args.board)
+
+    publishers = [UdpPublisher(port=args.udp_port, fmt=args.udp_format).start()] if args.udp_port else []
+    if args.lsl:
+        publishers.append(LslPublisher())
+    log = SessionLog(args.log, summary_every=None) if args.log else None
+    server = MultiBoardServer(model, boards, args.update_hz, publishers=publishers, log=log, smoothing=args.smoothing)
+    print(f"Serving {len(boards)} board(s) with {model}. Press Control + C to stop.")
+    deadline = time.monotonic() + args.duration if args.duration else None
+    with server:
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                time.sleep(0.1)
+                errors = server.errors()
+                if errors:
+                    raise next(iter(errors.values()))
+                if server.metrics.report_due(args.report_every):
+                    now = time.time()
+                    for name, s in server.state().items():
+                        if s["prediction"] is None:
+                            print(f"  {name:<14} waiting for data")
+                            continue
+                        state = "closed" if s["prediction"] else "open"
+                        print(f"  {name:<14} eyes {state:<7} alpha {np.mean(s['alpha_power']):10.3f}  "
+                              f"age {(now - s['updated']) * 1000:6.1f} ms  samples {s['samples']}")
+        except KeyboardInterrupt:
+            pass
+    server.metrics.counters.update(server.stats())
+    print(server.metrics.summary())
+    if log is not None:
+        log.event("end", **server.metrics.snapshot())
+        log.close()
+
+
+if __name__ == "__main__":
+    main()
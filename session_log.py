@@ -0,0 +1,188 @@
+import json
+import time
+import argparse
+import threading
+from collections import deque
+import numpy as np
+from publisher import decision_message, UdpPublisher, PORT
+
+LABEL_NAMES = {0: "open", 1: "closed"}
+
+
+class SessionLog:
+    """Structured JSONL log of a live session, written by a background thread.
+
+    decision() and event() only append a tuple to a deque, so the inference
+    and UI loops never format, encode or touch the file. The writer thread
+    drains the deque every `flush_every` s into one buffered write and, with
+    `summary_every`, prints a one-line human summary at most that often.
+    Without a `path` it only prints the summaries. A decision that changes
+    its board's state is followed by a "transition" event, so each board's
+    decisions must come from one thread.
+    """
+
+    def __init__(self, path=None, summary_every=1.0, flush_every=0.5):
+        self.path = path
+        self.summary_every = summary_every
+        self.flush_every = flush_every
+        self.written = 0
+        self._pending = deque()  # append/popleft are thread-safe without a lock
+        self._file = open(path, "a", buffering=1 << 16) if path else None
+        self._window = []        # decisions since the last summary
+        self._states = {}        # last decided prediction per board
+        self._last_summary = time.monotonic()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="session-log", daemon=True)
+        self._thread.start()
+
+    def decision(self, board, prediction, confidence, alpha_power, sample_time, stages=None):
+        """Queue one decision; `stages` maps stage names to the seconds they took for it."""
+        t = time.time()
+        self._pending.append(("decision", t, (board, prediction, confidence, alpha_power, sample_time, stages)))
+        if self._states.get(board) != prediction:
+            self._states[board] = prediction
+            self._pending.append(("transition", t, {
+                "board": board, "state": LABEL_NAMES.get(int(prediction), int(prediction)),
+                "confidence": round(float(confidence), 4), "sample_time": sample_time}))
+
+    def event(self, kind, **fields):
+        self._pending.append((kind, time.time(), fields))
+
+    def close(self):
+        self._stop_event.set()
+        self._thread.join()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # writer thread
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_every):
+            self._drain()
+        self._drain()
+        if self._window:
+            self._summarize()
+
+    def _drain(self):
+        lines = []
+        while self._pending:
+            kind, t, payload = self._pending.popleft()
+            if kind == "decision":
+                board, prediction, confidence, alpha_power, sample_time, stages = payload
+                record = {"type": kind, "t": t, "board": board, "prediction": int(prediction),
+                          "confidence": round(float(confidence), 4),
+                          "alpha_power": np.round(np.asarray(alpha_power, dtype=np.float64), 4).tolist(),
+                          "sample_time": sample_time, "latency_ms": round((t - sample_time) * 1e3, 3)}
+                if stages:
+                    record["stages_ms"] = {name: round(s * 1e3, 4) for name, s in stages.items()}
+                if self.summary_every:
+                    self._window.append(record)
+            else:
+                record = dict(payload, type=kind, t=t)
+            lines.append(json.dumps(record, separators=(",", ":")))
+        if lines and self._file is not None:
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            self.written += len(lines)
+        if self.summary_every and self._window and time.monotonic() - self._last_summary >= self.summary_every:
+            self._summarize()
+
+    def _summarize(self):
+        window, self._window = self._window, []
+        self._last_summary = time.monotonic()
+        last = window[-1]
+        closed = sum(r["prediction"] == 1 for r in window)
+        print(f"{time.strftime('%H:%M:%S', time.localtime(last['t']))}  "
+              f"eyes {LABEL_NAMES.get(last['prediction'], last['prediction']):<6} {last['confidence']:4.0%}  "
+              f"{len(window)} decisions, {closed / len(window):.0%} closed, "
+              f"alpha {np.mean(last['alpha_power']):.3f}, latency p50 {np.median([r['latency_ms'] for r in window]):.1f} ms")
+
+
+def read_log(path):
+    """Records of a session log, oldest first."""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def summarize(records):
+    """Per-board decision counts, eye state share and switches, confidence and latency percentiles."""
+    boards, transitions = {}, {}
+    for r in records:
+        if r["type"] == "decision":
+            boards.setdefault(r["board"], []).append(r)
+        elif r["type"] == "transition":
+            transitions[r["board"]] = transitions.get(r["board"], 0) + 1
+    out = {}
+    for board, rs in boards.items():
+        pred = np.array([r["prediction"] for r in rs])
+        latency = np.array([r["latency_ms"] for r in rs])
+        alpha = np.array([np.mean(r["alpha_power"]) for r in rs])
+        out[board] = {
+            "decisions": len(rs),
+            "seconds": rs[-1]["t"] - rs[0]["t"],
+            "closed_share": float(np.mean(pred == 1)),
+            "switches": int(np.count_nonzero(np.diff(pred))),
+            "transitions": transitions.get(board),
+            "confidence_p50": float(np.median([r["confidence"] for r in rs])),
+            "latency_p50_ms": float(np.percentile(latency, 50)),
+            "latency_p99_ms": float(np.percentile(latency, 99)),
+            "alpha_open": float(alpha[pred == 0].mean()) if np.any(pred == 0) else None,
+            "alpha_closed": float(alpha[pred == 1].mean()) if np.any(pred == 1) else None,
+        }
+    return out
+
+
+def replay(records, speed=1.0, publishers=()):
+    """Re-publish logged decisions with their original spacing, `speed` x faster."""
+    start, first = time.monotonic(), None
+    for r in records:
+        if r["type"] != "decision":
+            continue
+        first = first if first is not None else r["t"]
+        delay = (r["t"] - first) / speed - (time.monotonic() - start)
+        if delay > 0:
+            time.sleep(delay)
+        # sample time is shifted to now so subscribers measure their own delivery latency
+        msg = decision_message(r["board"], r["prediction"], r["confidence"], r["alpha_power"],
+                               time.time() - r["latency_ms"] / 1e3)
+        for publisher in publishers:
+            publisher.publish(msg)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize or replay a session log written with --log.")
+    parser.add_argument('log', type=str)
+    parser.add_argument('--replay', action='store_true', help='re-publish the decisions to UDP subscribers')
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--udp-port', type=int, default=PORT)
+    args = parser.parse_args()
+
+    for board, s in summarize(read_log(args.log)).items():
+        print(f"{board}: {s['decisions']} decisions over {s['seconds']:.1f} s, {s['closed_share']:.0%} closed, "
+              f"{s['switches']} switches" + (f", {s['transitions']} transition events" if s["transitions"] else ""))
+        print(f"  confidence p50 {s['confidence_p50']:.0%}  latency p50 {s['latency_p50_ms']:.1f} ms  "
+              f"p99 {s['latency_p99_ms']:.1f} ms")
+        if s["alpha_open"] is not None and s["alpha_closed"] is not None:
+            print(f"  mean alpha power open {s['alpha_open']:.3f}  closed {s['alpha_closed']:.3f}")
+
+    if args.replay:
+        publisher = UdpPublisher(port=args.udp_port).start()
+        print(f"Replaying at {args.speed:g}x on port {publisher.port}. Press Control + C to stop.")
+        try:
+            replay(read_log(args.log), args.speed, [publisher])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            publisher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+from contextlib import contextmanager
+import numpy as np
+from scipy.signal import lfilter
+from brainflow.board_shim import BoardIds
+from board_source import CYTON_BOARDS
+from metrics import Metrics
+from runtime import LatestValue, InferenceWorker
+from streaming_filter import StreamingBandpass
+from utils import announce
+
+GOOD, FLAT, RAILED, NOISY, LINE_NOISE = STATUSES = ("good", "flat", "railed", "noisy", "line_noise")
+MESSAGES = {FLAT: "flat signal, electrode off or shorted", RAILED: "signal at the amplifier rail",
+            NOISY: "noisy signal, check electrode contact", LINE_NOISE: "strong mains interference"}
+
+WINDOW_SEC = 2.0      # time constant of the rolling measures
+HOLD_SEC = 2.0        # a new status must persist this long before it is reported
+MIN_RMS_UV = 0.5      # 1-40 Hz RMS below this: no EEG reaches the amplifier
+MAX_RMS_UV = 100.0    # 1-40 Hz RMS above this: loose electrode or muscle
+MAX_LINE_RATIO = 1.0  # mains band power relative to 1-40 Hz power
+RAIL_FRACTION = 0.05  # share of samples at the rail that counts as railed
+CYTON_RAIL_UV = 187500.0 * 0.99  # ±4.5 V ADC range at the default gain of 24
+LINE_FREQS = (50.0, 60.0)
+
+
+class SignalQuality:
+    """Rolling per-channel signal quality, updated incrementally from the live stream.
+
+    Feed it new samples only; every measure is a one-pole moving average over
+    about `window_sec`, so an update costs the same however long the session
+    runs. Tracks 1-40 Hz RMS, mains (50 and 60 Hz) power relative to it,
+    flat lines and samples at the amplifier rail. A channel's status changes
+    only after the new status held for `hold_sec`.
+    """
+
+    def __init__(self, n_channels, sfreq, names=None, window_sec=WINDOW_SEC, hold_sec=HOLD_SEC,
+                 min_rms=MIN_RMS_UV, max_rms=MAX_RMS_UV, max_line_ratio=MAX_LINE_RATIO, rail=None):
+        self.names = list(names) if names is not None else list(range(n_channels))
+        self.min_rms = min_rms
+        self.max_rms = max_rms
+        self.max_line_ratio = max_line_ratio
+        self.rail = rail
+        self.eeg = StreamingBandpass(n_channels, sfreq, 1.0, 40.0, power_window=window_sec)
+        self.line = [StreamingBandpass(n_channels, sfreq, f - 2.0, f + 2.0, power_window=window_sec)
+                     for f in LINE_FREQS if f + 2.0 < sfreq / 2]
+        self._a = 1.0 - np.exp(-1.0 / (window_sec * sfreq))
+        self._rail_zi = np.zeros((n_channels, 1))
+        self.rail_fraction = np.zeros(n_channels)
+        self.warmup = int(window_sec * sfreq)
+        self.hold = int(hold_sec * sfreq)
+        self.seen = 0
+        self.status = [None] * n_channels      # reported status, None while warming up
+        self._candidate = [None] * n_channels  # (status, first sample) not yet reported
+        self.warnings = 0
+
+    @classmethod
+    def for_board(cls, board_id, n_channels, sfreq, **kwargs):
+        if board_id in CYTON_BOARDS:
+            kwargs.setdefault("rail", CYTON_RAIL_UV)
+        elif board_id == BoardIds.SYNTHETIC_BOARD.value:
+            # its sine waves reach ~1000 µV, an absolute RMS limit would flag every channel
+            kwargs.setdefault("max_rms", None)
+        return cls(n_channels, sfreq, **kwargs)
+
+    @property
+    def rms(self):
+        return np.sqrt(self.eeg.power)
+
+    @property
+    def line_ratio(self):
+        if not self.line:
+            return np.zeros_like(self.eeg.power)
+        line = np.max([f.power for f in self.line], axis=0)
+        return line / np.maximum(self.eeg.power, 1e-12)
+
+    def _classify(self):
+        rms, status = self.rms, np.full(len(self.names), GOOD, dtype=object)
+        status[self.line_ratio > self.max_line_ratio] = LINE_NOISE
+        if self.max_rms is not None:
+            status[rms > self.max_rms] = NOISY
+        status[rms < self.min_rms] = FLAT
+        if self.rail is not None:
+            status[self.rail_fraction > RAIL_FRACTION] = RAILED
+        return status
+
+    def update(self, block):
+        """Measure a (channels x new_samples) block; returns [(channel, old, new)] status changes."""
+        n = block.shape[1]
+        if n == 0:
+            return []
+        self.eeg.process(block)
+        for f in self.line:
+            f.process(block)
+        if self.rail is not None:
+            at_rail = (np.abs(block) >= self.rail).astype(np.float64)
+            smoothed, self._rail_zi = lfilter([self._a], [1.0, self._a - 1.0], at_rail, axis=1, zi=self._rail_zi)
+            self.rail_fraction = smoothed[:, -1]
+        self.seen += n
+        if self.seen < self.warmup:
+            return []
+
+        changes = []
+        for ch, new in enumerate(self._classify()):
+            if new == self.status[ch]:
+                self._candidate[ch] = None
+                continue
+            if self._candidate[ch] is None or self._candidate[ch][0] != new:
+                self._candidate[ch] = (new, self.seen)
+            # the first status after warm-up is reported at once
+            if self.status[ch] is None or self.seen - self._candidate[ch][1] >= self.hold:
+                changes.append((ch, self.status[ch], new))
+                self.status[ch] = new
+                self._candidate[ch] = None
+        return changes
+
+    def scores(self):
+        """Per-channel measures, status and a 0-1 quality score (1 is clean)."""
+        rms, ratio = self.rms, self.line_ratio
+        quality = np.minimum(1.0, self.max_line_ratio / np.maximum(ratio, 1e-12))
+        if self.max_rms is not None:
+            quality *= np.minimum(1.0, self.max_rms / np.maximum(rms, 1e-12))
+        quality[[s in (FLAT, RAILED) for s in self.status]] = 0.0
+        return {"channels": self.names, "status": list(self.status), "quality": quality.tolist(),
+                "rms_uv": rms.tolist(), "line_ratio": ratio.tolist(), "rail_fraction": self.rail_fraction.tolist()}
+
+    def bad_channels(self):
+        return [name for name, s in zip(self.names, self.status) if s not in (None, GOOD)]
+
+    def stats(self):
+        return {"bad_channels": len(self.bad_channels()), "quality_warnings": self.warnings}
+
+
+class QualityMonitor:
+    """Runs SignalQuality next to the other readers of a live RingBuffer.
+
+    Reads the `rows` of every sample that arrived since its last tick, prints
+    a warning when a channel degrades or recovers and returns the latest
+    scores. With `voice=True` the bad channels are also spoken as one
+    combined announcement, held back while quiet() is active. start() runs it on a thread of
+    its own that posts them to `latest`; several monitors can also share one
+    thread, see MultiBoardServer.
+    """
+
+    def __init__(self, quality, rows, label="", voice=False, metrics=None):
+        self.quality = quality
+        self.rows = rows
+        self.label = f"{label} " if label else ""
+        self.voice = voice
+        self.metrics = metrics or Metrics()
+        self.latest = LatestValue()
+        self.last = 0  # ring index of the first sample not yet measured
+        self._warmed_up = False
+        self._quiet = False
+        self._unspoken = False  # reported changes not yet announced
+
+    def step(self, ring):
+        stop = ring.written
+        start = max(self.last, stop - ring.capacity)
+        if stop == start:
+            return None
+        self.last = stop
+        with self.metrics.time("quality"):
+            changes = self.quality.update(ring.view(start, stop)[self.rows])
+        if not self._warmed_up and self.quality.seen >= self.quality.warmup:
+            self._warmed_up = True
+            bad = self.quality.bad_channels()
+            print(f"{'⚠️' if bad else '✅'} {self.label}signal quality: "
+                  f"{len(self.quality.names) - len(bad)}/{len(self.quality.names)} channels good")
+        for ch, old, new in changes:
+            self._unspoken |= self._report(self.quality.names[ch], old, new)
+        if self.voice and self._unspoken and not self._quiet:
+            self._unspoken = False
+            bad = self.quality.bad_channels()
+            # one keyed message for all channels, a newer state replaces one not yet spoken
+            announce(f"Check electrode{'s' if len(bad) > 1 else ''} {', '.join(map(str, bad))}." if bad
+                     else "Electrodes are fine again.", key="quality")
+        return self.quality.scores()
+
+    @contextmanager
+    def quiet(self):
+        """Hold spoken warnings, e.g. while a training round records; the latest state is spoken after."""
+        self._quiet = True
+        try:
+            yield self
+        finally:
+            self._quiet = False
+
+    def _report(self, name, old, new):
+        """Print a status change; True if it is worth announcing."""
+        if new != GOOD:
+            self.quality.warnings += 1
+            print(f"⚠️ {self.label}channel {name}: {MESSAGES[new]}")
+            return True
+        if old is not None:
+            print(f"✅ {self.label}channel {name} recovered")
+            return True
+        return False
+
+    def start(self, ring, rate_hz=4.0):
+        """Monitor `ring` on a thread of its own; returns the started worker."""
+        worker = InferenceWorker(ring, self.step, rate_hz, self.latest, name="quality")
+        worker.start()
+        return worker
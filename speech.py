@@ -0,0 +1,93 @@
+import threading
+from collections import OrderedDict, deque
+
+
+class SpeechWorker:
+    """Text-to-speech on a background thread with one long-lived pyttsx3 engine.
+
+    Plain prompts are spoken in order and never dropped, ahead of keyed
+    announcements. Announcements sharing a `key` coalesce, so only the
+    latest pending text for that key is ever spoken, and at most `maxsize`
+    of them wait; when full the oldest pending one is dropped.
+    """
+
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._prompts = deque()        # (text, done event), instructions and cues
+        self._pending = OrderedDict()  # key -> (text, done event)
+        self._spoken = {}              # key -> last text handed to the engine
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def say(self, text, key=None, wait=False):
+        """Queue `text`; only block until it has been spoken when `wait` is set.
+
+        Without a `key` it is a prompt and always spoken; keyed text may be
+        replaced or dropped, see announce().
+        """
+        print(f"[TTS] {text}")
+        done = threading.Event()
+        with self._cond:
+            if key is None:
+                self._prompts.append((text, done))
+            else:
+                self._discard(key)
+                while len(self._pending) >= self.maxsize:
+                    self._discard(next(iter(self._pending)))
+                    self.dropped += 1
+                self._pending[key] = (text, done)
+            self._ensure_thread()
+            self._cond.notify()
+        if wait:
+            done.wait()
+
+    def announce(self, text, key="state"):
+        """Speak `text` only when it differs from what was last said for `key`."""
+        with self._cond:
+            pending = self._pending.get(key)
+            last = self._spoken.get(key)
+            if pending is None and last == text:
+                return
+            if pending is not None and last == text:
+                # flipped back before the change was spoken, nothing to say
+                self._discard(key)
+                return
+            if pending is not None and pending[0] == text:
+                return
+        self.say(text, key=key)
+
+    def _discard(self, key):
+        item = self._pending.pop(key, None)
+        if item is not None:
+            item[1].set()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        engine = None
+        while True:
+            with self._cond:
+                while not self._prompts and not self._pending:
+                    self._cond.wait()
+                if self._prompts:
+                    text, done = self._prompts.popleft()
+                else:
+                    key, (text, done) = self._pending.popitem(last=False)
+                    self._spoken[key] = text
+            try:
+                if engine is None:
+                    import pyttsx3
+                    engine = pyttsx3.init()
+                if engine is not False:
+                    engine.say(text)
+                    engine.runAndWait()
+            except Exception as e:
+                # No audio driver (e.g. headless CI): keep the console output only
+                print(f"[TTS] speech disabled: {e}")
+                engine = False
+            finally:
+                done.set()
@@ -0,0 +1,113 @@
+import time
+import socket
+import argparse
+import threading
+from metrics import LatencyHistogram
+from publisher import HOST, PORT, SUBSCRIBE, UNSUBSCRIBE, CLIENT_TIMEOUT, FORMATS, UdpPublisher, decode, decision_message
+
+
+def listen(host=HOST, port=PORT, duration=None, on_message=None):
+    """Subscribe to a UdpPublisher and receive until `duration` s pass or Ctrl+C.
+
+    Returns (delivery, end_to_end, received, lost): publish-to-receive and
+    sample-to-receive latency histograms plus message counts, with losses
+    counted from gaps in the sequence numbers.
+    """
+    addr = (host, port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(0.5)
+    delivery, end_to_end = LatencyHistogram(), LatencyHistogram()
+    received, lost, last_seq = 0, 0, None
+    deadline = time.monotonic() + duration if duration else None
+    next_subscribe = 0.0
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            if time.monotonic() >= next_subscribe:
+                sock.sendto(SUBSCRIBE, addr)  # doubles as the keep-alive
+                next_subscribe = time.monotonic() + CLIENT_TIMEOUT / 2
+            try:
+                payload = sock.recv(65536)
+            except socket.timeout:
+                continue
+            now = time.time()
+            msg = decode(payload)
+            delivery.record(now - msg["sent"])
+            end_to_end.record(now - msg["sample_time"])
+            if last_seq is not None and msg["seq"] > last_seq + 1:
+                lost += msg["seq"] - last_seq - 1
+            last_seq = msg["seq"]
+            received += 1
+            if on_message is not None:
+                on_message(msg)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.sendto(UNSUBSCRIBE, addr)
+        sock.close()
+    return delivery, end_to_end, received, lost
+
+
+def circle_view():
+    """Eye state circle as a subscriber callback, the old live UI without the inference loop."""
+    import matplotlib.pyplot as plt
+
+    plt.ion()
+    fig, ax = plt.subplots()
+    circle = plt.Circle((0.5, 0.5), 0.3, color="gray")
+    ax.add_patch(circle)
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.axis("off")
+
+    def on_message(msg):
+        circle.set_color("green" if msg["prediction"] == 0 else "blue")
+        ax.set_title(f"{msg['board']}  {msg['confidence']:.0%}")
+        fig.canvas.draw_idle()
+        fig.canvas.flush_events()
+
+    return on_message
+
+
+def _publish_fake(publisher, rate_hz, stop):
+    """Self-test source: a decision every 1/rate_hz s, timestamped as if just sampled."""
+    while not stop.wait(1.0 / rate_hz):
+        publisher.publish(decision_message("selftest", 0, 1.0, [0.0] * 8, time.time()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Subscribe to live decisions and measure delivery latency.")
+    parser.add_argument('--host', type=str, default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--duration', type=float, default=None, help='seconds to listen, until Ctrl+C by default')
+    parser.add_argument('--plot', action='store_true', help='show the eye state circle')
+    parser.add_argument('--self-test', action='store_true',
+                        help='publish fake decisions in-process over loopback instead of joining a running session')
+    parser.add_argument('--rate', type=float, default=100.0, help='self-test messages per second')
+    parser.add_argument('--format', choices=FORMATS, default='json', help='self-test message format')
+    args = parser.parse_args()
+
+    publisher, stop = None, threading.Event()
+    if args.self_test:
+        publisher = UdpPublisher(args.host, 0, args.format).start()
+        args.port = publisher.port
+        threading.Thread(target=_publish_fake, args=(publisher, args.rate, stop), daemon=True).start()
+        args.duration = args.duration or 5.0
+
+    print(f"Listening on {args.host}:{args.port}...")
+    try:
+        delivery, end_to_end, received, lost = listen(args.host, args.port, args.duration,
+                                                      circle_view() if args.plot else None)
+    finally:
+        stop.set()
+        if publisher is not None:
+            publisher.stop()
+
+    print(f"Received {received} message(s), {lost} lost")
+    for name, hist in (("publish → receive", delivery), ("sample → receive", end_to_end)):
+        s = hist.stats()
+        print(f"  {name:<18} p50 {s['p50'] * 1e3:7.3f} ms  p95 {s['p95'] * 1e3:7.3f} ms  "
+              f"p99 {s['p99'] * 1e3:7.3f} ms  max {s['max'] * 1e3:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import numpy as np
+from scipy.signal import butter, lfilter, sosfilt, sosfilt_zi
+
+
+class StreamingBandpass:
+    """Causal band-pass filter that keeps its IIR state between calls.
+
+    Feed it only the samples that arrived since the last call; the output is
+    the same as filtering the whole recording in one go.
+    """
+
+    def __init__(self, n_channels, sfreq, low=8.0, high=12.0, order=4, power_window=1.0):
+        self.sos = butter(order, [low, high], btype="band", fs=sfreq, output="sos")
+        self.zi = np.zeros((self.sos.shape[0], n_channels, 2))
+        self.primed = False
+
+        # one-pole smoother over the squared output, time constant = power_window seconds
+        self._a = 1.0 - np.exp(-1.0 / (power_window * sfreq))
+        self._power_zi = np.zeros((n_channels, 1))
+        self.power = np.zeros(n_channels)
+
+    def reset(self):
+        self.zi[:] = 0.0
+        self._power_zi[:] = 0.0
+        self.power[:] = 0.0
+        self.primed = False
+
+    def process(self, block):
+        """Filter a (channels x new_samples) block and update the rolling band power."""
+        if block.shape[1] == 0:
+            return block
+
+        if not self.primed:
+            # Start from the steady state of the first sample so the DC offset of
+            # the raw signal doesn't ring through the filter.
+            self.zi = sosfilt_zi(self.sos)[:, None, :] * block[None, :, 0, None]
+            self.primed = True
+
+        out, self.zi = sosfilt(self.sos, block, axis=1, zi=self.zi)
+        smoothed, self._power_zi = lfilter([self._a], [1.0, self._a - 1.0], out ** 2,
+                                           axis=1, zi=self._power_zi)
+        self.power = smoothed[:, -1]
+        return out
+
+
+class FilterBank:
+    """One StreamingBandpass per (name, low, high) band; outputs (bands x channels x samples)."""
+
+    def __init__(self, n_channels, sfreq, bands, order=4):
+        self.filters = [StreamingBandpass(n_channels, sfreq, low, high, order) for _, low, high in bands]
+
+    def reset(self):
+        for f in self.filters:
+            f.reset()
+
+    def process(self, block):
+        return np.stack([f.process(block) for f in self.filters])
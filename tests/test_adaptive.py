@@ -0,0 +1,31 @@
+import numpy as np
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
+from adaptive import OnlineLDA
+
+
+def fitted_lda(seed=0, n=200, d=6):
+    rng = np.random.default_rng(seed)
+    y = np.arange(n) % 2
+    X = rng.normal(size=(n, d)) @ rng.normal(size=(d, d)) + y[:, None]
+    return LDA(store_covariance=True).fit(X, y), rng
+
+
+def test_starts_as_the_fitted_lda():
+    clf, rng = fitted_lda()
+    online = OnlineLDA.from_lda(clf)
+    x = rng.normal(size=clf.means_.shape[1])
+    np.testing.assert_allclose(online.predict_proba(x), clf.predict_proba(x[None])[0], atol=1e-4)
+
+
+def test_precision_tracks_the_inverse_covariance():
+    clf, rng = fitted_lda()
+    online = OnlineLDA.from_lda(clf, forgetting=0.99)
+    cov = np.linalg.inv(online.precision)
+    for i in range(500):
+        x, label, rate = rng.normal(size=cov.shape[0]) * 3, i % 2, rng.uniform(0.25, 1.0)
+        eta = (1.0 - online.forgetting) * rate
+        diff = x - online.means[label]
+        cov = (1.0 - eta) * cov + eta * np.outer(diff, diff)
+        online.update(x, label, rate)
+    np.testing.assert_allclose(online.precision, np.linalg.inv(cov), rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(online.coef, np.linalg.inv(cov) @ (online.means[1] - online.means[0]), rtol=1e-8)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
+from compiled_model import CompiledModel, export_model
+from pipelines import make_classifier
+
+
+def epochs(seed=0, n=60, bands=2, channels=4, samples=125):
+    rng = np.random.default_rng(seed)
+    y = np.arange(n) % 2
+    X = rng.normal(size=(n, bands, channels, samples))
+    X[y == 1, :, 0] *= 2.0  # class 1 has more variance on the first channel
+    return X, y
+
+
+@pytest.mark.parametrize("name", ["shrinkage_lda", "logreg", "csp_lda"])
+def test_pipelines_match_sklearn(name, tmp_path):
+    X, y = epochs()
+    clf = make_classifier(name).fit(X, y)
+    compiled = CompiledModel.load(export_model(clf, str(tmp_path / "model.npz")))
+    expected = clf.predict_proba(X)
+    np.testing.assert_allclose(compiled.predict_proba(X), expected, atol=1e-10)
+    for x, p in zip(X[:5], expected):
+        np.testing.assert_allclose(compiled.proba(x), p, atol=1e-10)
+
+
+def test_feature_lda_keeps_what_online_adaptation_needs(tmp_path):
+    rng = np.random.default_rng(1)
+    y = np.arange(100) % 2
+    X = rng.normal(size=(100, 6)) + y[:, None]
+    clf = LDA(store_covariance=True).fit(X, y)
+    compiled = CompiledModel.load(export_model(clf, str(tmp_path / "lda.npz")))
+    np.testing.assert_allclose(compiled.predict_proba(X), clf.predict_proba(X), atol=1e-10)
+    np.testing.assert_allclose(compiled.covariance_, clf.covariance_)
+    np.testing.assert_array_equal(compiled.classes_, clf.classes_)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from runtime import RingBuffer
+
+
+def stream(n_rows, n_samples):
+    return np.arange(n_rows * n_samples, dtype=float).reshape(n_rows, n_samples)
+
+
+def test_latest_is_contiguous_across_wraparound():
+    ring = RingBuffer(2, 8)
+    data = stream(2, 30)
+    for start in range(0, 30, 3):
+        ring.write(data[:, start:start + 3])
+        n = min(ring.written, ring.capacity)
+        latest = ring.latest(n)
+        np.testing.assert_array_equal(latest, data[:, ring.written - n:ring.written])
+        assert np.shares_memory(latest, ring._buf)
+
+
+def test_view_of_overwritten_samples_raises():
+    ring = RingBuffer(1, 8)
+    ring.write(stream(1, 12))
+    np.testing.assert_array_equal(ring.view(4, 12), stream(1, 12)[:, 4:])
+    with pytest.raises(IndexError):
+        ring.view(3, 12)
+
+
+def test_oversized_write_keeps_the_newest_samples():
+    ring = RingBuffer(1, 8)
+    ring.write(stream(1, 11))
+    assert ring.written == 11
+    assert ring.overruns == 3
+    np.testing.assert_array_equal(ring.latest(8), stream(1, 11)[:, 3:])
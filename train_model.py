@@ -1,74 +1,202 @@
 # train_model.py
 import os
-import time
 import pickle
+import argparse
 import numpy as np
-import pandas as pd
 from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
-from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds
-from brainflow.data_filter import DataFilter, FilterTypes
-from utils import speak, get_timestamp, save_csv_with_header
+from sklearn.model_selection import GroupKFold, cross_val_score
+from brainflow.board_shim import BoardShim, BoardIds
+from board_source import open_board, board_sleep, borrow, accel_rows
+from artifacts import ArtifactDetector
+from cache import ContentCache
+from compiled_model import export_model, compiled_path
+from dataset import DatasetCatalog
+from features import epoch_view, epoch_features, feature_params, feature_signature
+from model_search import train_best
+from recorder import SessionRecorder
+from registry import default_registry
+from runtime import RingBuffer, AcquisitionThread
+from signal_quality import SignalQuality, QualityMonitor
+from utils import speak, get_timestamp
 
 SAVE_DIR = "models/training_data"
 MODEL_DIR = "models/trained_models"
 
-def train_new_model():
-    os.makedirs(SAVE_DIR, exist_ok=True)
-    os.makedirs(MODEL_DIR, exist_ok=True)
+def recording_features(recordings, labels, sfreq, groups=None, accel=None, detector=None):
+    """Epoch features, per-epoch labels and per-epoch groups for (channels x samples) recordings.
 
-    speak("Starting new training session.")
-    params = BrainFlowInputParams()
-    params.serial_port = "/dev/cu.usbserial-DP04VYIJ"
-    board = BoardShim(BoardIds.CYTON_BOARD.value, params)
+    `groups` defaults to one group per recording. With an ArtifactDetector,
+    epochs it flags are dropped; an unfitted detector is first fitted on
+    these recordings. `accel` holds the matching accelerometer rows.
+    """
+    # Cut every recording into overlapping epochs and featurize them all in one call
+    n_samples = min(r.shape[1] for r in recordings)
+    epochs = epoch_view(np.stack([r[:, -n_samples:] for r in recordings]), sfreq)
+    features = epoch_features(epochs, sfreq)  # (recordings, epochs, features)
+    y = np.repeat(labels, features.shape[1])
+    groups = np.repeat(np.arange(len(recordings)) if groups is None else groups, features.shape[1])
+    features = features.reshape(-1, features.shape[-1])
+    if detector is None:
+        return features, y, groups
 
-    board.prepare_session()
-    board.start_stream()
+    accel_epochs = None if accel is None else epoch_view(np.stack([a[:, -n_samples:] for a in accel]), sfreq)
+    measures = detector.measure(epochs, accel_epochs)
+    if not detector.fitted:
+        detector.fit_measures(measures)
+    keep = detector.clean_from(measures).ravel()
+    print(f"Dropped {np.count_nonzero(~keep)} of {keep.size} epochs with artifacts")
+    return features[keep], y[keep], groups[keep]
 
-    rtime = 3
-    sfreq = BoardShim.get_sampling_rate(BoardIds.CYTON_BOARD.value)
-    eeg_channels = BoardShim.get_eeg_channels(BoardIds.CYTON_BOARD.value)
-    speak("Recording five rounds of eye open and eye closed.")
-    X, y = [], []
-
-    for i in range(10):
-        # Eyes open
-        speak(f"Round {i + 1}: Please keep your eyes open.")
-        time.sleep(1) #to give time to change
-        speak("Go.")
-        time.sleep(rtime)  # short buffer for user to react
-        data_open = board.get_current_board_data(sfreq*rtime)  # ~10s at 250Hz
-        X.append(data_open[eeg_channels, :])
-        y.extend([0] * data_open.shape[1])
-        save_csv_with_header(data_open, f"{SAVE_DIR}/open_{get_timestamp()}.csv")
-
-        # Eyes closed
-        speak("Now close your eyes.")
-        time.sleep(1)  # to give time to change
-        speak("Go.")
-        time.sleep(rtime)
-        data_closed = board.get_current_board_data(sfreq*rtime)
-        X.append(data_closed[eeg_channels, :])
-        y.extend([1] * data_closed.shape[1])
-        save_csv_with_header(data_closed, f"{SAVE_DIR}/closed_{get_timestamp()}.csv")
-
-    board.stop_stream()
-    board.release_session()
-
-    # Convert to features
-    X = np.concatenate(X, axis=1)
-    features = []
-    for row in X:
-        DataFilter.perform_bandpass(row, sfreq, 8.0, 12.0, 4, FilterTypes.BUTTERWORTH.value, 0)
-        features.append(np.mean(row ** 2))
-    features = np.array(features).reshape(-1, 1)
-    y = np.array(y[:features.shape[0]])
-
-    clf = LDA()
+def _cv_accuracy(clf, features, y, groups):
+    # Hold out whole recording rounds, overlapping epochs of one round would leak
+    n_splits = min(5, len(np.unique(groups)))
+    if n_splits < 2:
+        return None
+    return float(np.mean(cross_val_score(clf, features, y, groups=groups, cv=GroupKFold(n_splits))))
+
+def fit_lda(features, y, groups):
+    """The LDA every training path saves, with its grouped CV accuracy (None with a single group)."""
+    clf = LDA(store_covariance=True)  # covariance lets live prediction adapt the model online
+    accuracy = _cv_accuracy(clf, features, y, groups)
     clf.fit(features, y)
+    return clf, accuracy
+
+def _fit_and_save(features, y, groups, sfreq, eeg_channels, **meta):
+    clf, accuracy = fit_lda(features, y, groups)
 
     model_name = f"{MODEL_DIR}/lda_{get_timestamp()}.pkl"
     with open(model_name, "wb") as f:
         pickle.dump(clf, f)
+    compiled = export_model(clf, compiled_path(model_name))  # what live prediction loads
+    default_registry().register(
+        model_name, compiled=os.path.basename(compiled), classifier="lda", sfreq=sfreq, eeg_channels=list(eeg_channels),
+        features=feature_params(sfreq), signature=feature_signature(sfreq, eeg_channels),
+        scores={"cv_accuracy": accuracy}, n_epochs=len(y), **meta)
+    return model_name
+
+def _latest(ring, n, threads):
+    """Copy of the newest `n` samples (fewer right after start), all board rows."""
+    for thread in threads:
+        if thread.error is not None:
+            raise thread.error
+    return ring.latest(min(n, ring.written)).copy()
+
+def _record_rounds(conn, subject=None, rounds=10, rtime=3):
+    """Prompted eyes open/closed recordings from an open BoardConnection: EEG, accel and labels.
+
+    Accel is None for boards without an accelerometer.
+    """
+    board_id = conn.get_board_id()
+    sfreq = BoardShim.get_sampling_rate(board_id)
+    eeg_channels = BoardShim.get_eeg_channels(board_id)
+    accel_channels = accel_rows(board_id)
+
+    # one acquisition thread feeds both the recordings and the signal quality monitor
+    ring = RingBuffer(BoardShim.get_num_rows(board_id), 2 * rtime * sfreq)
+    acquisition = AcquisitionThread(conn, ring, slice(None))
+    monitor = QualityMonitor(SignalQuality.for_board(board_id, len(eeg_channels), sfreq, names=eeg_channels),
+                             eeg_channels, voice=True)
+    acquisition.start()
+    quality = monitor.start(ring)
+
+    recorder = SessionRecorder(SAVE_DIR, board_id, subject=subject)
+    speak("Recording five rounds of eye open and eye closed.")
+    recordings, labels = [], []
+    accel = [] if accel_channels else None  # None for boards without an accelerometer
+    try:
+        for i in range(rounds):
+            # Eyes open
+            speak(f"Round {i + 1}: Please keep your eyes open.")
+            board_sleep(conn, 1) #to give time to change
+            speak("Go.", wait=True)  # recording starts once the cue has been heard
+            with monitor.quiet():  # electrode warnings wait until the round is recorded
+                board_sleep(conn, rtime)  # short buffer for user to react
+            data_open = _latest(ring, sfreq * rtime, (acquisition, quality))
+            recordings.append(data_open[eeg_channels, :])
+            if accel is not None:
+                accel.append(data_open[accel_channels, :])
+            labels.append(0)
+            recorder.append(data_open, label="open", round=i)
+
+            # Eyes closed
+            speak("Now close your eyes.")
+            board_sleep(conn, 1)  # to give time to change
+            speak("Go.", wait=True)
+            with monitor.quiet():
+                board_sleep(conn, rtime)
+            data_closed = _latest(ring, sfreq * rtime, (acquisition, quality))
+            recordings.append(data_closed[eeg_channels, :])
+            if accel is not None:
+                accel.append(data_closed[accel_channels, :])
+            labels.append(1)
+            recorder.append(data_closed, label="closed", round=i)
+    finally:
+        quality.stop()
+        acquisition.stop()
+        quality.join()
+        acquisition.join()
+        recorder.close()
+    return recordings, accel, labels
 
+def train_new_model(board=None, subject=None, search=False):
+    """Record a prompted session and train on it.
+
+    `board` may be an open BoardConnection shared with later stages, it is
+    then left open; anything else is opened and released here.
+    """
+    os.makedirs(SAVE_DIR, exist_ok=True)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+
+    speak("Starting new training session.")
+    board = board or open_board()
+    board_id = board.get_board_id()
+    sfreq = BoardShim.get_sampling_rate(board_id)
+    eeg_channels = BoardShim.get_eeg_channels(board_id)
+
+    with borrow(board) as conn:
+        recordings, accel, labels = _record_rounds(conn, subject)
+    DatasetCatalog(SAVE_DIR).update()  # index the new session for later retraining
+
+    rounds = np.arange(len(recordings)) // 2  # open and closed of a round share a group
+    if search:
+        # bands, epoch length and classifier picked by grouped cross-validation
+        speak("Searching for the best model.")
+        model_name = train_best(recordings, labels, rounds, sfreq, eeg_channels, accel=accel,
+                                detector=ArtifactDetector.for_board(board_id), subject=subject, board_id=board_id)
+    else:
+        detector = ArtifactDetector.for_board(board_id)
+        features, y, groups = recording_features(recordings, labels, sfreq, rounds, accel, detector)
+        model_name = _fit_and_save(features, y, groups, sfreq, eeg_channels,
+                                   subject=subject, board_id=board_id, artifacts=detector.state())
     speak(f"Training complete. Model saved as {model_name}")
     return model_name
+
+def train_from_dataset(subject=None, board_id=BoardIds.CYTON_BOARD.value, since=None, move=False):
+    """Retrain on every indexed eyes-open/eyes-closed recording, no headset needed."""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    catalog = DatasetCatalog(SAVE_DIR)
+    catalog.update(move=move)
+    records = catalog.select(label=("open", "closed"), subject=subject, board_id=board_id, since=since)
+    if not records:
+        raise ValueError("No matching recordings in the dataset")
+    # unchanged segments come straight from the feature cache
+    detector = ArtifactDetector.for_board(board_id)
+    features, y, groups = catalog.features(records, cache=ContentCache(), detector=detector)
+
+    model_name = _fit_and_save(features, y, groups, records[0]["sfreq"], records[0]["eeg_channels"],
+                               subject=subject, board_id=board_id, artifacts=detector.state())
+    print(f"Trained on {len(records)} recordings ({len(y)} epochs). Model saved as {model_name}")
+    return model_name
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain an LDA on every indexed eyes open/closed recording.")
+    parser.add_argument('--subject', type=str, default=None)
+    parser.add_argument('--board-id', type=int, default=BoardIds.CYTON_BOARD.value)
+    parser.add_argument('--since', type=str, default=None, help='only recordings from YYYYmmdd_HHMMSS on')
+    parser.add_argument('--move', action='store_true',
+                        help='move legacy open_/closed_ CSVs into their imported session folders instead of copying')
+    args = parser.parse_args()
+    train_from_dataset(args.subject, args.board_id, args.since, args.move)
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,63 @@
 # utils.py
-import os
 import time
-import pyttsx3
-import pandas as pd
+from brainflow.board_shim import BoardShim
+from registry import default_registry
+from speech import SpeechWorker
 
-def speak(text):
-    print(f"[TTS] {text}")
-    engine = pyttsx3.init()
-    engine.say(text)
-    engine.runAndWait()
+_speech = SpeechWorker()
+
+def speak(text, wait=False):
+    # Non-blocking unless the caller needs the cue to have been heard
+    _speech.say(text, wait=wait)
+
+def announce(text, key="state"):
+    # Only speaks state changes, stale pending states are replaced
+    _speech.announce(text, key)
 
 def get_timestamp():
     return time.strftime("%Y%m%d_%H%M%S")
 
-def choose_model():
-    model_dir = "models/trained_models"
-    os.makedirs(model_dir, exist_ok=True)
-    models = [f for f in os.listdir(model_dir) if f.endswith(".pkl")]
+def choose_model(subject=None, board_id=None, shown=20):
+    """Prompt for a saved model that loads on `board_id`'s channel layout; None means train a new one."""
+    registry = default_registry()
+    registry.sync()
+    entries = registry.select(subject=subject)  # newest first
+    # models from before the registry have no feature signature and can't be loaded live
+    loadable = [e for e in entries if e.get("signature") is not None]
+    if len(loadable) < len(entries):
+        print(f"{len(entries) - len(loadable)} model(s) trained before the registry are hidden, retrain to use them")
+    layout = {}
+    if board_id is not None:
+        layout = {"sfreq": BoardShim.get_sampling_rate(board_id), "eeg_channels": BoardShim.get_eeg_channels(board_id)}
+        fits = {e["file"] for e in registry.select(subject=subject, **layout)}
+        other = [e for e in loadable if e["file"] not in fits]
+        if other:
+            print(f"{len(other)} model(s) trained on another board's channel layout are hidden")
+        loadable = [e for e in loadable if e["file"] in fits]
+    models = loadable[:shown]
     if not models:
         speak("No saved models found. Training a new one.")
         return None
+    best = registry.best(subject, **layout)
 
     print("\nAvailable models:")
     for i, m in enumerate(models):
-        print(f"{i + 1}: {m}")
+        accuracy = m.get("scores", {}).get("cv_accuracy")
+        score = f"cv accuracy {accuracy:.0%}" if accuracy is not None else "not validated"
+        tag = "  ← best" if best is not None and m["file"] == best["file"] else ""
+        print(f"{i + 1}: {m['file']} ({score}, subject {m.get('subject') or '-'}){tag}")
 
-    choice = input("Enter model number or 'n' for new: ").strip().lower()
+    choice = input("Enter model number, 'b' for best or 'n' for new: ").strip().lower()
     if choice == "n":
         return None
     try:
-        idx = int(choice) - 1
-        return os.path.join(model_dir, models[idx])
-    except:
+        entry = best if choice == "b" and best is not None else models[int(choice) - 1]
+    except (ValueError, IndexError):
         speak("Invalid choice. Training a new model.")
         return None
+    path = registry.path(entry["file"])
+    registry.preload([path])  # unpickle in the background while the board session starts
+    return path
 
 def save_csv_with_header(data, filepath):
     columns = [
@@ -45,6 +69,8 @@ def save_csv_with_header(data, filepath):
         "Digital Channel 4 (D18)", "Analog Channel 0", "Analog Channel 1",
         "Analog Channel 2", "Timestamp", "Marker Channel", "Timestamp (Formatted)"
     ]
+    import pandas as pd  # only CSV export needs it, keep it off the startup path
+
     df = pd.DataFrame(data.T)
     df.columns = columns[:df.shape[1]]
     df.to_csv(filepath, index=False)